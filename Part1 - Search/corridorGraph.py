@@ -0,0 +1,210 @@
+"""
+A corridor-compressed view of a maze.
+
+Most Pacman mazes are long corridors that are one cell wide.
+A `CorridorGraph` only keeps the cells where something can happen
+(junctions with three or more exits and dead ends) as nodes,
+and collapses every corridor between two of them into a single weighted edge
+that remembers the cells and actions it is made of.
+Graphs only depend on the walls, so they are built once per layout and cached.
+
+`corridorSearch` runs a uniform cost search over this much smaller graph
+for any problem whose states are positions (e.g. `PositionSearchProblem` or `AnyFoodSearchProblem`).
+Goal cells inside corridors (like food) are found by scanning each corridor once when it is relaxed,
+and the result is expanded back into a normal list of `pacai.core.directions.Directions`.
+"""
+
+import heapq
+import itertools
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.student.distanceTable import wallsHash
+from pacai.student.search import SearchNodes
+from pacai.student.search import SearchStats
+
+CARDINAL_DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+# Graphs that were already built by this process, keyed by wall hash.
+_graphs = {}
+
+class CorridorEdge(object):
+    """
+    A corridor from one node to another.
+    `cells` and `actions` are parallel: taking `actions[i]` leads into `cells[i]`,
+    and the last cell is the destination node.
+    """
+
+    __slots__ = ('start', 'end', 'cells', 'actions')
+
+    def __init__(self, start, end, cells, actions):
+        self.start = start
+        self.end = end
+        self.cells = tuple(cells)
+        self.actions = tuple(actions)
+
+    def __len__(self):
+        return len(self.cells)
+
+class CorridorGraph(object):
+    """
+    Junctions and dead ends of a wall grid, connected by corridor edges.
+    """
+
+    def __init__(self, walls):
+        self.walls = walls
+        self.neighbors = {}
+
+        for x in range(walls.getWidth()):
+            for y in range(walls.getHeight()):
+                if not walls[x][y]:
+                    self.neighbors[(x, y)] = self._openNeighbors((x, y))
+
+        self.nodes = {cell for cell, neighbors in self.neighbors.items() if len(neighbors) != 2}
+        self.edges = {}
+
+        for node in list(self.nodes):
+            self._addEdges(node)
+
+        # Loops without any junction still need one node to be reachable.
+        covered = set(self.nodes)
+        for edges in self.edges.values():
+            for edge in edges:
+                covered.update(edge.cells)
+
+        for cell in sorted(self.neighbors):
+            if cell not in covered:
+                self.nodes.add(cell)
+                self._addEdges(cell)
+                for edge in self.edges[cell]:
+                    covered.update(edge.cells)
+
+    def _openNeighbors(self, cell):
+        neighbors = []
+        for action in CARDINAL_DIRECTIONS:
+            x, y = Actions.getSuccessor(cell, action)
+            x, y = int(x), int(y)
+            if not self.walls[x][y]:
+                neighbors.append(((x, y), action))
+
+        return neighbors
+
+    def _addEdges(self, node):
+        self.edges[node] = [self.walk(node, action) for _, action in self.neighbors[node]]
+
+    def walk(self, cell, action):
+        """
+        Follow the corridor that starts by taking `action` from `cell` until it reaches a node.
+        """
+
+        cells = []
+        actions = []
+
+        while True:
+            cell = next(neighbor for neighbor, neighborAction in self.neighbors[cell]
+                    if neighborAction == action)
+            cells.append(cell)
+            actions.append(action)
+
+            if cell in self.nodes:
+                return CorridorEdge(None, cell, cells, actions)
+
+            reverse = Actions.reverseDirection(action)
+            action = next(neighborAction for _, neighborAction in self.neighbors[cell]
+                    if neighborAction != reverse)
+
+    def outgoing(self, cell):
+        """
+        Get the edges leaving a cell.
+        For a node these are its cached edges,
+        for a cell inside a corridor these are the walks to both ends of that corridor.
+        """
+
+        if cell in self.nodes:
+            return self.edges[cell]
+
+        return [self.walk(cell, action) for _, action in self.neighbors[cell]]
+
+def getCorridorGraph(walls):
+    """
+    Get the (cached) corridor graph for a wall grid.
+    """
+
+    key = wallsHash(walls)
+    if key not in _graphs:
+        _graphs[key] = CorridorGraph(walls)
+
+    return _graphs[key]
+
+def corridorSearch(problem):
+    """
+    Uniform cost search over the corridor graph of `problem.walls`.
+    States must be positions, and step costs come from `problem.costFn` if it has one
+    (otherwise every step costs 1).
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    graph = getCorridorGraph(problem.walls)
+    costFn = getattr(problem, 'costFn', None)
+
+    start = problem.startingState()
+    if problem.isGoal(start):
+        return []
+
+    nodes = SearchNodes()
+    bestCost = {start: 0}
+    bestNode = {start: nodes.add(start, -1, (), 0)}
+    counter = itertools.count()
+    frontier = [(0, next(counter), bestNode[start])]
+    stats.recordPush()
+
+    goalCost = float('inf')
+    goalPath = None
+
+    while frontier:
+        cost, _, node = heapq.heappop(frontier)
+        stats.recordPop()
+
+        if cost >= goalCost:
+            break
+
+        cell = nodes.states[node]
+        if bestNode[cell] != node:
+            stats.stale += 1
+            continue
+
+        stats.expanded += 1
+        for edge in graph.outgoing(cell):
+            edgeCost = cost
+            foundGoal = False
+            for index, edgeCell in enumerate(edge.cells):
+                edgeCost += costFn(edgeCell) if costFn is not None else 1
+
+                if edgeCost < goalCost and problem.isGoal(edgeCell):
+                    goalCost = edgeCost
+                    goalPath = (node, edge.actions[:index + 1])
+                    foundGoal = True
+                    break
+
+            # Anything past a goal inside this corridor can not lead to a cheaper goal.
+            if foundGoal:
+                continue
+
+            end = edge.end
+            if edgeCost >= bestCost.get(end, float('inf')):
+                stats.dominated += 1
+                continue
+
+            bestCost[end] = edgeCost
+            bestNode[end] = nodes.add(end, node, edge.actions, edgeCost)
+            heapq.heappush(frontier, (edgeCost, next(counter), bestNode[end]))
+            stats.recordPush()
+
+    if goalPath is None:
+        return []
+
+    node, lastActions = goalPath
+    actions = [action for segment in nodes.path(node) for action in segment]
+    return actions + list(lastActions)
@@ -0,0 +1,135 @@
+"""
+Vectorized BFS distance fields over a wall grid.
+
+Many callers only need the maze distance from some position (or set of positions) to every cell,
+e.g. to find the closest food or to see how far away each ghost is.
+Instead of running a Python level BFS, the wall grid is turned into a boolean NumPy array once,
+and the BFS wavefront is grown one step at a time with whole-array shifts.
+
+A field can be seeded from many sources at once (all food, all ghosts, ...),
+in which case every cell gets the distance to its closest source.
+Fields are indexed as `field[x, y]`, like `pacai.core.grid.Grid`.
+
+For example, inside an evaluation function:
+```
+field = distanceFieldFor(gameState, [gameState.getPacmanPosition()])
+closestFood = minDistance(field, gameState.getFood().asList())
+```
+"""
+
+import numpy
+
+UNREACHABLE = numpy.iinfo(numpy.int32).max
+
+
+# The open cell array of the most recently used wall grids, keyed by id (the grid is kept too,
+# so a reused id can be detected).
+_openArrays = {}
+MAX_CACHED_GRIDS = 16
+
+def openArray(walls):
+    """
+    Get a (width, height) boolean array that is True for every non-wall cell of a wall grid.
+    """
+
+    cached = _openArrays.get(id(walls))
+    if cached is not None and cached[0] is walls:
+        return cached[1]
+
+    width = walls.getWidth()
+    height = walls.getHeight()
+    result = numpy.array([[not walls[x][y] for y in range(height)] for x in range(width)],
+            dtype = bool).reshape((width, height))
+
+    if len(_openArrays) >= MAX_CACHED_GRIDS:
+        _openArrays.clear()
+
+    _openArrays[id(walls)] = (walls, result)
+    return result
+
+def distanceField(walls, sources, maxDistance = None):
+    """
+    Get a (width, height) int32 array of the maze distance from every cell to its closest source.
+    `sources` is a list of positions, or a (width, height) boolean array that is True at every source.
+    Walls, and cells that can not be reached (within `maxDistance`, if given), are `UNREACHABLE`.
+    Source positions that are not exactly on a cell are snapped to the nearest one.
+    """
+
+    isOpen = openArray(walls)
+    distances = numpy.full(isOpen.shape, UNREACHABLE, dtype = numpy.int32)
+
+    if isinstance(sources, numpy.ndarray):
+        frontier = sources & isOpen
+    else:
+        frontier = numpy.zeros(isOpen.shape, dtype = bool)
+        for x, y in sources:
+            x, y = int(x + 0.5), int(y + 0.5)
+            if isOpen[x, y]:
+                frontier[x, y] = True
+
+    distances[frontier] = 0
+    visited = frontier.copy()
+    grown = numpy.empty_like(frontier)
+
+    distance = 0
+    while frontier.any():
+        distance += 1
+        if maxDistance is not None and distance > maxDistance:
+            break
+
+        grown[:] = False
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        grown &= isOpen
+        grown &= ~visited
+
+        distances[grown] = distance
+        visited |= grown
+        frontier, grown = grown, frontier
+
+    return distances
+
+def distanceFieldFor(gameState, sources, maxDistance = None):
+    """
+    `distanceField` over the walls of a game state.
+    """
+
+    return distanceField(gameState.getWalls(), sources, maxDistance)
+
+def minDistance(field, positions):
+    """
+    The smallest value of a field over some positions,
+    or infinity if there are no positions or none of them can be reached.
+    """
+
+    if len(positions) == 0:
+        return float('inf')
+
+    xs = [int(x + 0.5) for x, _ in positions]
+    ys = [int(y + 0.5) for _, y in positions]
+    distance = field[xs, ys].min()
+    if distance == UNREACHABLE:
+        return float('inf')
+
+    return int(distance)
+
+def distanceAt(field, position):
+    """
+    The value of a field at one position, or infinity if it can not be reached.
+    """
+
+    x, y = position
+    distance = field[int(x + 0.5), int(y + 0.5)]
+    if distance == UNREACHABLE:
+        return float('inf')
+
+    return int(distance)
+
+def distancesTo(field, positions):
+    """
+    The value of a field at each of some positions (`UNREACHABLE` for cells that can not be reached).
+    """
+
+    return [int(field[int(x + 0.5), int(y + 0.5)]) for x, y in positions]
@@ -0,0 +1,198 @@
+"""
+All-pairs maze distances for a layout.
+
+A BFS is run once from every open cell of a wall grid and the results are stored in a
+compact NumPy matrix (one unsigned 16 bit distance per pair of open cells).
+Tables are kept in memory for the rest of the process.
+They can also be saved to disk, keyed by a hash of the wall grid,
+so later runs on the same layout just memory-map the saved file instead of recomputing it.
+Saving is off unless a cache directory is given to `getDistanceTable`
+or set in the `PACAI_DISTANCE_CACHE` environment variable.
+
+Any agent or heuristic can get a table with:
+```
+table = getDistanceTable(gameState.getWalls())
+table.getDistance((1, 1), (5, 3))
+```
+"""
+
+import collections
+import hashlib
+import logging
+import os
+
+import numpy
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+
+UNREACHABLE = numpy.iinfo(numpy.uint16).max
+
+CACHE_DIR_ENV = 'PACAI_DISTANCE_CACHE'
+
+CARDINAL_DIRECTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+# Tables that were already loaded by this process, keyed by wall hash.
+_loadedTables = {}
+
+def wallsHash(walls):
+    """
+    A stable hex digest that identifies a wall grid.
+    """
+
+    width = walls.getWidth()
+    height = walls.getHeight()
+
+    digest = hashlib.sha1(('%d,%d:' % (width, height)).encode())
+    digest.update(bytes(bool(walls[x][y]) for x in range(width) for y in range(height)))
+
+    return digest.hexdigest()
+
+def openCells(walls):
+    """
+    Get all the non-wall cells of a grid, in column major order.
+    """
+
+    return [(x, y) for x in range(walls.getWidth()) for y in range(walls.getHeight())
+            if not walls[x][y]]
+
+def computeDistances(cells, cellIds):
+    """
+    Run a BFS from every open cell and return the distances as an (n x n) uint16 matrix.
+    """
+
+    neighbors = []
+    for position in cells:
+        cellNeighbors = []
+        for action in CARDINAL_DIRECTIONS:
+            neighbor = Actions.getSuccessor(position, action)
+            neighbor = (int(neighbor[0]), int(neighbor[1]))
+            if neighbor in cellIds:
+                cellNeighbors.append(cellIds[neighbor])
+
+        neighbors.append(cellNeighbors)
+
+    distances = numpy.full((len(cells), len(cells)), UNREACHABLE, dtype = numpy.uint16)
+
+    for source in range(len(cells)):
+        row = distances[source]
+        row[source] = 0
+
+        fringe = collections.deque([source])
+        while fringe:
+            cell = fringe.popleft()
+            distance = row[cell] + 1
+
+            for neighbor in neighbors[cell]:
+                if row[neighbor] == UNREACHABLE:
+                    row[neighbor] = distance
+                    fringe.append(neighbor)
+
+    return distances
+
+class DistanceTable(object):
+    """
+    Maze distances between every pair of open cells of one wall grid.
+    Positions that are not exactly on a cell (e.g. scared ghosts) are snapped to the nearest cell.
+    """
+
+    def __init__(self, walls, distances, cells = None):
+        self.walls = walls
+        self.cells = cells if cells is not None else openCells(walls)
+        self.cellIds = {position: index for index, position in enumerate(self.cells)}
+        self.distances = distances
+
+    def getCellId(self, position):
+        x, y = position
+        return self.cellIds[(int(x + 0.5), int(y + 0.5))]
+
+    def getDistance(self, start, end):
+        """
+        The maze distance between two positions, or infinity if there is no path.
+        """
+
+        distance = self.distances[self.getCellId(start), self.getCellId(end)]
+        if distance == UNREACHABLE:
+            return float('inf')
+
+        return int(distance)
+
+    def getDistancesFrom(self, position):
+        """
+        The row of the table for a position, indexed by cell id.
+        """
+
+        return self.distances[self.getCellId(position)]
+
+    def getMinDistance(self, position, targets):
+        """
+        The maze distance from a position to the closest of some targets,
+        or infinity if there are no (reachable) targets.
+        """
+
+        if len(targets) == 0:
+            return float('inf')
+
+        row = self.getDistancesFrom(position)
+        distance = row[[self.getCellId(target) for target in targets]].min()
+        if distance == UNREACHABLE:
+            return float('inf')
+
+        return int(distance)
+
+def getDistanceTable(walls, cacheDir = None):
+    """
+    Get the distance table for a wall grid.
+    Tables are reused within a process.
+    If `cacheDir` (or else the `PACAI_DISTANCE_CACHE` environment variable) is set,
+    tables are also saved to (and memory-mapped from) that directory.
+    """
+
+    key = wallsHash(walls)
+    if key in _loadedTables:
+        return _loadedTables[key]
+
+    if cacheDir is None:
+        cacheDir = os.environ.get(CACHE_DIR_ENV)
+
+    path = None
+    if cacheDir:
+        path = os.path.join(cacheDir, key + '.npy')
+
+    cells = openCells(walls)
+
+    distances = None
+    if path is not None and os.path.isfile(path):
+        try:
+            distances = numpy.load(path, mmap_mode = 'r')
+        except (OSError, ValueError) as ex:
+            logging.warning('Could not load distance table %s: %s.' % (path, ex))
+
+        if distances is not None and distances.shape != (len(cells), len(cells)):
+            logging.warning('Distance table %s does not match its layout, recomputing.' % (path))
+            distances = None
+
+    if distances is None:
+        table = DistanceTable(walls, None, cells)
+        distances = computeDistances(cells, table.cellIds)
+        table.distances = distances
+        if path is not None:
+            _saveDistances(path, distances)
+    else:
+        table = DistanceTable(walls, distances, cells)
+
+    _loadedTables[key] = table
+    return table
+
+def _saveDistances(path, distances):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok = True)
+
+        # Write to a temp file first so that a concurrent reader never sees a partial table.
+        tempPath = '%s.%d.tmp' % (path, os.getpid())
+        with open(tempPath, 'wb') as file:
+            numpy.save(file, distances)
+
+        os.replace(tempPath, path)
+    except OSError as ex:
+        logging.warning('Could not save distance table %s: %s.' % (path, ex))
@@ -0,0 +1,193 @@
+"""
+Jump Point Search for 4-connected grids with unit step costs.
+
+On open areas there are many shortest paths that only differ in the order of their moves,
+and a normal search expands all of them.
+Jump Point Search only considers one canonical ordering of those paths:
+vertical moves may turn horizontally at any cell,
+but horizontal moves only turn vertically where a wall forces them to
+(the cell behind the turn, on the side of the turn, is a wall).
+Straight runs are then followed without putting anything on the frontier
+until they reach the goal or a cell where the canonical path could branch (a jump point).
+
+The search works directly on a `pacai.core.grid.Grid` of walls
+(like the `walls` of `PositionSearchProblem` and `pacai.student.searchAgents.CornersProblem`)
+and returns an ordinary list of `pacai.core.directions.Directions`.
+"""
+
+import heapq
+import itertools
+
+from pacai.core.actions import Actions
+from pacai.core.distance import manhattan
+from pacai.student.search import SearchStats
+
+HORIZONTAL = 0
+VERTICAL = 1
+
+class JumpPointGrid(object):
+    """
+    The jump rules over one wall grid and one goal.
+    """
+
+    def __init__(self, walls, goal):
+        self.walls = walls
+        self.goal = goal
+        self.width = walls.getWidth()
+        self.height = walls.getHeight()
+
+    def isOpen(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and not self.walls[x][y]
+
+    def forcedTurns(self, x, y, dx):
+        """
+        Get the vertical directions that a horizontal move (in direction dx)
+        that reached (x, y) is forced to be allowed to turn into.
+        """
+
+        return [dy for dy in (1, -1) if self.isOpen(x, y + dy) and not self.isOpen(x - dx, y + dy)]
+
+    def jumpHorizontal(self, x, y, dx):
+        """
+        Follow a horizontal run from (x, y) and return the first jump point on it, or None.
+        """
+
+        while True:
+            x += dx
+            if not self.isOpen(x, y):
+                return None
+
+            if (x, y) == self.goal or self.forcedTurns(x, y, dx):
+                return (x, y)
+
+    def jumpVertical(self, x, y, dy):
+        """
+        Follow a vertical run from (x, y) and return the first jump point on it, or None.
+        Since vertical moves may turn at any cell,
+        a cell is a jump point if a horizontal run from it finds one.
+        """
+
+        while True:
+            y += dy
+            if not self.isOpen(x, y):
+                return None
+
+            if (x, y) == self.goal:
+                return (x, y)
+
+            if self.jumpHorizontal(x, y, 1) is not None or self.jumpHorizontal(x, y, -1) is not None:
+                return (x, y)
+
+    def successors(self, position, axis, direction):
+        """
+        Get the (jump point, axis, direction) triples reachable from a jump point
+        that was entered moving along `axis` in `direction` (axis None for the start).
+        """
+
+        x, y = position
+        moves = []
+
+        if axis is None or axis == VERTICAL:
+            moves += [(HORIZONTAL, 1), (HORIZONTAL, -1)]
+            moves += [(VERTICAL, 1), (VERTICAL, -1)] if axis is None else [(VERTICAL, direction)]
+        else:
+            moves.append((HORIZONTAL, direction))
+            moves += [(VERTICAL, dy) for dy in self.forcedTurns(x, y, direction)]
+
+        result = []
+        for moveAxis, moveDirection in moves:
+            if moveAxis == HORIZONTAL:
+                jumpPoint = self.jumpHorizontal(x, y, moveDirection)
+            else:
+                jumpPoint = self.jumpVertical(x, y, moveDirection)
+
+            if jumpPoint is not None:
+                result.append((jumpPoint, moveAxis, moveDirection))
+
+        return result
+
+def jumpPointPath(walls, start, goal, stats = None):
+    """
+    Get a shortest list of actions from `start` to `goal` over a wall grid
+    (an empty list if they are the same cell or there is no path).
+    """
+
+    if stats is None:
+        stats = SearchStats()
+
+    start = (int(start[0]), int(start[1]))
+    goal = (int(goal[0]), int(goal[1]))
+    if start == goal:
+        return []
+
+    grid = JumpPointGrid(walls, goal)
+    counter = itertools.count()
+
+    # States are (position, axis, direction), since the allowed turns depend on how a cell was entered.
+    startState = (start, None, None)
+    bestCost = {startState: 0}
+    parents = {startState: None}
+    frontier = [(manhattan(start, goal), next(counter), 0, startState)]
+    stats.recordPush()
+
+    while frontier:
+        _, _, cost, state = heapq.heappop(frontier)
+        stats.recordPop()
+
+        if cost > bestCost[state]:
+            stats.stale += 1
+            continue
+
+        position, axis, direction = state
+        if position == goal:
+            return _expandPath(state, parents)
+
+        stats.expanded += 1
+        for jumpPoint, jumpAxis, jumpDirection in grid.successors(position, axis, direction):
+            nextState = (jumpPoint, jumpAxis, jumpDirection)
+            nextCost = cost + manhattan(position, jumpPoint)
+
+            if nextCost >= bestCost.get(nextState, float('inf')):
+                stats.dominated += 1
+                continue
+
+            bestCost[nextState] = nextCost
+            parents[nextState] = state
+            heapq.heappush(frontier,
+                    (nextCost + manhattan(jumpPoint, goal), next(counter), nextCost, nextState))
+            stats.recordPush()
+
+    return []
+
+def _expandPath(state, parents):
+    """
+    Turn the chain of jump points that ends at `state` back into single step actions.
+    """
+
+    actions = []
+    while parents[state] is not None:
+        position, axis, direction = state
+        previous = parents[state][0]
+
+        if axis == HORIZONTAL:
+            action = Actions.vectorToDirection((direction, 0))
+        else:
+            action = Actions.vectorToDirection((0, direction))
+
+        actions += [action] * manhattan(previous, position)
+        state = parents[state]
+
+    actions.reverse()
+    return actions
+
+def jumpPointSearch(problem):
+    """
+    Jump Point Search for single goal problems over positions with unit step costs,
+    like `PositionSearchProblem` with its default cost function.
+    Uses `problem.walls`, `problem.startingState()` and `problem.goal`.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    return jumpPointPath(problem.walls, problem.startingState(), problem.goal, stats)
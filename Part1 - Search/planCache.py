@@ -0,0 +1,193 @@
+"""
+An on-disk cache of search plans, shared between runs (and processes).
+
+Search agents find the same plan every time they are run on the same layout,
+so plans are stored in an SQLite database and looked up before searching.
+A plan is keyed by everything it depends on:
+a hash of the walls and the food, Pacman's starting position,
+and a name for the problem and algorithm (e.g. the agent's `fn`, `prob`, and `heuristic`).
+When a layout changes its hash changes too, so stale plans are never returned;
+they just stop being used and are eventually evicted.
+Agents still check a cached plan with `planFits` before following it,
+and drop every plan of the layout (`PlanCache.invalidate`) if it walks into a wall.
+
+The cache holds at most `maxEntries` plans and evicts the least recently used ones.
+It lives at the `PACAI_PLAN_CACHE` environment variable, or `~/.cache/pacai/plans.sqlite`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from pacai.core.actions import Actions
+from pacai.student.distanceTable import wallsHash
+
+CACHE_PATH_ENV = 'PACAI_PLAN_CACHE'
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'pacai', 'plans.sqlite')
+DEFAULT_MAX_ENTRIES = 10000
+
+# Caches that were already opened by this process, keyed by path.
+_openCaches = {}
+
+def planKey(gameState, *names):
+    """
+    Get the (wall hash, plan key) of a plan that starts from a game state.
+    `names` identify how the plan was made, e.g. the problem and search function.
+    """
+
+    walls = wallsHash(gameState.getWalls())
+    food = wallsHash(gameState.getFood())
+    x, y = gameState.getPacmanPosition()
+
+    digest = hashlib.sha1(('%s:%s:%d,%d' % (walls, food, int(x), int(y))).encode())
+    for name in names:
+        digest.update((':' + str(name)).encode())
+
+    return walls, digest.hexdigest()
+
+def planFits(gameState, actions):
+    """
+    Check that a plan only moves through open cells of a game state's layout.
+    """
+
+    walls = gameState.getWalls()
+    x, y = gameState.getPacmanPosition()
+    for action in actions:
+        dx, dy = Actions.directionToVector(action)
+        x, y = int(x + dx), int(y + dy)
+        if walls[x][y]:
+            return False
+
+    return True
+
+class PlanCache(object):
+    """
+    A size limited, least recently used cache of plans in an SQLite database.
+    If the database can not be opened, every lookup misses and nothing is stored.
+    """
+
+    def __init__(self, path = None, maxEntries = DEFAULT_MAX_ENTRIES):
+        if path is None:
+            path = os.environ.get(CACHE_PATH_ENV, DEFAULT_CACHE_PATH)
+
+        self.path = path
+        self.maxEntries = int(maxEntries)
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+
+        try:
+            if os.path.dirname(path) != '':
+                os.makedirs(os.path.dirname(path), exist_ok = True)
+
+            self._connection = sqlite3.connect(path, timeout = 10.0)
+            with self._connection:
+                self._connection.execute('''
+                    CREATE TABLE IF NOT EXISTS plans (
+                        key TEXT PRIMARY KEY,
+                        walls TEXT NOT NULL,
+                        actions TEXT NOT NULL,
+                        lastUsed REAL NOT NULL
+                    )
+                ''')
+                self._connection.execute('CREATE INDEX IF NOT EXISTS plansLastUsed ON plans (lastUsed)')
+                self._connection.execute('CREATE INDEX IF NOT EXISTS plansWalls ON plans (walls)')
+        except (OSError, sqlite3.Error) as ex:
+            logging.warning('Could not open plan cache %s: %s.' % (path, ex))
+            self._connection = None
+
+    def get(self, key):
+        """
+        Get a cached plan (a list of actions), or None.
+        """
+
+        if self._connection is None:
+            self.misses += 1
+            return None
+
+        try:
+            with self._connection:
+                row = self._connection.execute('SELECT actions FROM plans WHERE key = ?',
+                        (key,)).fetchone()
+                if row is not None:
+                    self._connection.execute('UPDATE plans SET lastUsed = ? WHERE key = ?',
+                            (time.time(), key))
+        except sqlite3.Error as ex:
+            logging.warning('Could not read plan cache %s: %s.' % (self.path, ex))
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, walls, actions):
+        """
+        Store a plan, evicting the least recently used plans if the cache is full.
+        """
+
+        if self._connection is None:
+            return
+
+        try:
+            with self._connection:
+                self._connection.execute(
+                        'INSERT OR REPLACE INTO plans (key, walls, actions, lastUsed) VALUES (?, ?, ?, ?)',
+                        (key, walls, json.dumps(list(actions)), time.time()))
+
+                count = self._connection.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+                if count > self.maxEntries:
+                    self._connection.execute('''
+                        DELETE FROM plans WHERE key IN
+                            (SELECT key FROM plans ORDER BY lastUsed ASC LIMIT ?)
+                    ''', (count - self.maxEntries,))
+        except sqlite3.Error as ex:
+            logging.warning('Could not write plan cache %s: %s.' % (self.path, ex))
+
+    def invalidate(self, walls = None):
+        """
+        Drop the plans for one wall hash (see `planKey`), or every plan.
+        """
+
+        if self._connection is None:
+            return
+
+        with self._connection:
+            if walls is None:
+                self._connection.execute('DELETE FROM plans')
+            else:
+                self._connection.execute('DELETE FROM plans WHERE walls = ?', (walls,))
+
+    def __len__(self):
+        if self._connection is None:
+            return 0
+
+        return self._connection.execute('SELECT COUNT(*) FROM plans').fetchone()[0]
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+def getPlanCache(path = None, maxEntries = None):
+    """
+    Get the (shared within this process) plan cache at a path.
+    A new cache holds `maxEntries` plans (`DEFAULT_MAX_ENTRIES` if not given).
+    If the cache is already open, it keeps its limit unless `maxEntries` is given,
+    in which case it takes on the new one (and drops its extra plans on the next `PlanCache.put`).
+    """
+
+    if path is None:
+        path = os.environ.get(CACHE_PATH_ENV, DEFAULT_CACHE_PATH)
+
+    if path not in _openCaches:
+        _openCaches[path] = PlanCache(path, DEFAULT_MAX_ENTRIES if maxEntries is None else maxEntries)
+    elif maxEntries is not None:
+        _openCaches[path].maxEntries = int(maxEntries)
+
+    return _openCaches[path]
@@ -2,107 +2,800 @@
 In this file, you will implement generic search algorithms which are called by Pacman agents.
 """
 
+import collections
+import heapq
+import itertools
+import logging
+import math
+import time
+from array import array
+
+from pacai.core.actions import Actions
 from pacai.util.stack import Stack
 from pacai.util.priorityQueue import PriorityQueue
 from pacai.util.queue import Queue
 
-def depthFirstSearch(problem):
-    stack = Stack()
-    visited = set()
+class SearchNodes(object):
+    """
+    A compact, array-backed arena of search nodes.
+
+    Instead of carrying a full action list with every frontier entry,
+    each node is identified by an integer index and only remembers its state,
+    the index of its parent, the action that produced it, and its path cost.
+    The action list is rebuilt by walking the parent indices once a goal is found.
+    """
 
-    stack.push((problem.startingState(), []))
+    def __init__(self):
+        self.states = []
+        self.parents = array('l')
+        self.costs = array('d')
+        self._actionCodes = array('l')
+        self._actionNames = []
+        self._actionIndex = {}
 
-    while not stack.isEmpty():
-        current_state, path = stack.pop()
+    def add(self, state, parent = -1, action = None, cost = 0):
+        """
+        Store a new node and return its index.
+        """
 
-        if current_state in visited:
-            continue
+        code = self._actionIndex.get(action)
+        if code is None:
+            code = len(self._actionNames)
+            self._actionIndex[action] = code
+            self._actionNames.append(action)
 
-        visited.add(current_state)
+        self.states.append(state)
+        self.parents.append(parent)
+        self._actionCodes.append(code)
+        self.costs.append(cost)
 
-        if problem.isGoal(current_state):
-            return path
+        return len(self.states) - 1
 
-        for successor, action, _ in problem.successorStates(current_state):
-            if successor not in visited:
-                stack.push((successor, path + [action]))
+    def path(self, node):
+        """
+        Rebuild the list of actions that leads from the root to the given node.
+        """
 
-    return []
+        actions = []
+        while self.parents[node] != -1:
+            actions.append(self._actionNames[self._actionCodes[node]])
+            node = self.parents[node]
 
+        actions.reverse()
+        return actions
 
-def breadthFirstSearch(problem):
-    queue = Queue()
-    visited = set()
+    def __len__(self):
+        return len(self.states)
 
-    queue.push((problem.startingState(), []))
+class BucketQueue(object):
+    """
+    A priority queue for small non-negative integer priorities (Dial's algorithm):
+    an array of FIFO buckets indexed by priority, with O(1) push and amortized O(1) pop.
+    Unit and 0/1 step costs (with integer heuristics) always fit,
+    which covers every position, corners and food problem in this project.
 
-    while not queue.isEmpty():
-        current_state, path = queue.pop()
+    The first time a priority does not fit (it is negative, fractional, too large, or not finite,
+    e.g. an infinite heuristic for a dead end),
+    the queue moves all of its entries into a `pacai.util.priorityQueue.PriorityQueue`
+    and keeps using that heap from then on.
+    Entries with equal priority come out in the order they went in, either way.
+    """
 
-        if current_state in visited:
-            continue
+    MAX_BUCKETS = 1 << 16
+
+    def __init__(self):
+        self._buckets = []
+        self._cursor = 0
+        self._size = 0
+        self._heap = None
 
-        visited.add(current_state)
+    def push(self, item, priority):
+        self._size += 1
 
-        if problem.isGoal(current_state):
-            return path
+        if self._heap is None and math.isfinite(priority):
+            index = int(priority)
+            if index == priority and 0 <= index < BucketQueue.MAX_BUCKETS:
+                if index >= len(self._buckets):
+                    self._buckets.extend([None] * (index + 1 - len(self._buckets)))
 
-        for successor, action, _ in problem.successorStates(current_state):
-            if successor not in visited:
-                queue.push((successor, path + [action]))
+                if self._buckets[index] is None:
+                    self._buckets[index] = collections.deque()
 
-    return []
+                self._buckets[index].append(item)
 
+                # Inconsistent heuristics can push below the current minimum.
+                if index < self._cursor:
+                    self._cursor = index
 
-def uniformCostSearch(problem):
-    pq = PriorityQueue()
+                return
+
+        if self._heap is None:
+            self._moveToHeap()
+
+        self._heap.push(item, priority)
+
+    def pop(self):
+        self._size -= 1
+
+        if self._heap is not None:
+            return self._heap.pop()
+
+        while not self._buckets[self._cursor]:
+            self._cursor += 1
+
+        return self._buckets[self._cursor].popleft()
+
+    def isEmpty(self):
+        return self._size == 0
+
+    def isHeap(self):
+        return self._heap is not None
+
+    def __len__(self):
+        return self._size
+
+    def _moveToHeap(self):
+        self._heap = PriorityQueue()
+
+        for priority in range(self._cursor, len(self._buckets)):
+            for item in self._buckets[priority] or ():
+                self._heap.push(item, priority)
+
+        self._buckets = []
+
+class SearchStats(object):
+    """
+    Counters collected by a single run of a search function.
+    After a search, the stats are available as `problem.searchStats`.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.pushed = 0
+        self.dominated = 0
+        self.stale = 0
+        self.frontierSize = 0
+        self.peakFrontier = 0
+
+    def recordPush(self):
+        self.pushed += 1
+        self.frontierSize += 1
+        if self.frontierSize > self.peakFrontier:
+            self.peakFrontier = self.frontierSize
+
+    def recordPop(self):
+        self.frontierSize -= 1
+
+    def __repr__(self):
+        return ('SearchStats(expanded: %d, pushed: %d, dominated: %d, stale: %d, peakFrontier: %d)'
+                % (self.expanded, self.pushed, self.dominated, self.stale, self.peakFrontier))
+
+def graphSearch(problem, frontier, priority = None, trackCosts = False):
+    """
+    The search kernel shared by all of the search functions in this file.
+
+    `frontier` is any of the pacai containers (stack, queue, or priority queue)
+    and holds node indices into a `SearchNodes` arena.
+    If `priority` is given, it is called as `priority(state, cost)`
+    and the frontier is pushed to with the returned priority.
+
+    If `trackCosts` is set, the best known path cost of every generated state is kept.
+    Pushes that are not cheaper than an already queued copy of the same state are dropped,
+    and queue entries that have since been beaten are skipped when they are popped.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    nodes = SearchNodes()
     visited = set()
+    bestCost = {}
+
+    def push(state, parent, action, cost):
+        if trackCosts:
+            if cost >= bestCost.get(state, float('inf')):
+                stats.dominated += 1
+                return
+
+            bestCost[state] = cost
+
+        node = nodes.add(state, parent, action, cost)
+        if priority is None:
+            frontier.push(node)
+        else:
+            frontier.push(node, priority(state, cost))
 
-    pq.push((problem.startingState(), [], 0), 0)
+        stats.recordPush()
 
-    while not pq.isEmpty():
-        current_state, path, current_cost = pq.pop()
+    push(problem.startingState(), -1, None, 0)
+
+    while not frontier.isEmpty():
+        node = frontier.pop()
+        stats.recordPop()
+        current_state = nodes.states[node]
 
         if current_state in visited:
             continue
 
+        current_cost = nodes.costs[node]
+        if trackCosts and current_cost > bestCost[current_state]:
+            stats.stale += 1
+            continue
+
         visited.add(current_state)
 
         if problem.isGoal(current_state):
-            return path
+            logging.debug('Search finished: %s.' % (stats))
+            return nodes.path(node)
 
+        stats.expanded += 1
         for successor, action, step_cost in problem.successorStates(current_state):
             if successor not in visited:
-                new_cost = current_cost + step_cost
-                pq.push((successor, path + [action], new_cost), new_cost)
+                push(successor, node, action, current_cost + step_cost)
 
+    logging.debug('Search failed: %s.' % (stats))
     return []
 
+def depthFirstSearch(problem):
+    return graphSearch(problem, Stack())
+
+def breadthFirstSearch(problem):
+    return graphSearch(problem, Queue())
+
+def uniformCostSearch(problem):
+    return graphSearch(problem, BucketQueue(), lambda state, cost: cost, trackCosts = True)
 
 def aStarSearch(problem, heuristic):
-    pq = PriorityQueue()
-    visited = set()
+    return graphSearch(problem, BucketQueue(),
+            lambda state, cost: cost + heuristic(state, problem), trackCosts = True)
+
+def greedySearch(problem, heuristic):
+    """
+    Greedy best-first search: always expand the state that looks closest to a goal,
+    ignoring the cost so far.
+    Usually fast, but the plan it finds is not necessarily optimal.
+    """
+
+    return graphSearch(problem, BucketQueue(), lambda state, cost: heuristic(state, problem))
+
+class ReversedProblem(object):
+    """
+    A view of a single goal search problem that swaps its start and goal,
+    so that heuristics written against `problem.goal` estimate the distance back to the start.
+    Everything else is looked up on the wrapped problem.
+    """
+
+    def __init__(self, problem):
+        self._problem = problem
+        self.goal = problem.startingState()
+
+    def startingState(self):
+        return self._problem.goal
+
+    def isGoal(self, state):
+        return state == self.goal
+
+    def __getattr__(self, name):
+        return getattr(self._problem, name)
+
+def predecessorStates(problem, state):
+    """
+    Get the (predecessor, action, cost) triples of a state,
+    where `action` leads from the predecessor to the state.
+    Problems can supply their own `predecessorStates` method,
+    otherwise successors are assumed to be reversible with symmetric costs.
+    """
+
+    if hasattr(problem, 'predecessorStates'):
+        return problem.predecessorStates(state)
+
+    return [(predecessor, Actions.reverseDirection(action), cost)
+            for predecessor, action, cost in problem.successorStates(state)]
+
+def bidirectionalSearch(problem):
+    """
+    Breadth first search from both the start and the goal (`problem.goal`) of a problem
+    with unit step costs, always growing the smaller of the two frontiers by a full layer.
+    The first state reached from both sides lies on a shortest path.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    start = problem.startingState()
+    if problem.isGoal(start):
+        return []
+
+    forwardNodes = SearchNodes()
+    backwardNodes = SearchNodes()
+    forwardSeen = {start: forwardNodes.add(start)}
+    backwardSeen = {problem.goal: backwardNodes.add(problem.goal)}
+    forwardLayer = [forwardSeen[start]]
+    backwardLayer = [backwardSeen[problem.goal]]
+
+    while forwardLayer and backwardLayer:
+        forward = len(forwardLayer) <= len(backwardLayer)
+        if forward:
+            nodes, seen, otherSeen, layer = forwardNodes, forwardSeen, backwardSeen, forwardLayer
+        else:
+            nodes, seen, otherSeen, layer = backwardNodes, backwardSeen, forwardSeen, backwardLayer
+
+        nextLayer = []
+        for node in layer:
+            state = nodes.states[node]
+            stats.expanded += 1
+
+            if forward:
+                successors = problem.successorStates(state)
+            else:
+                successors = predecessorStates(problem, state)
+
+            for successor, action, step_cost in successors:
+                if successor in seen:
+                    continue
+
+                child = nodes.add(successor, node, action, nodes.costs[node] + step_cost)
+                seen[successor] = child
+                nextLayer.append(child)
+
+                if successor in otherSeen:
+                    stats.peakFrontier = max(stats.peakFrontier,
+                            len(nextLayer) + len(forwardLayer if not forward else backwardLayer))
+                    return _stitch(forwardNodes, forwardSeen[successor],
+                            backwardNodes, backwardSeen[successor])
+
+        if forward:
+            forwardLayer = nextLayer
+        else:
+            backwardLayer = nextLayer
+
+        stats.peakFrontier = max(stats.peakFrontier, len(forwardLayer) + len(backwardLayer))
+
+    return []
 
-    start_state = problem.startingState()
-    pq.push((start_state, [], 0), 0 + heuristic(start_state, problem))
+def bidirectionalAStarSearch(problem, heuristic):
+    """
+    A* from both the start and the goal (`problem.goal`) of a problem.
+    The backward search evaluates `heuristic` on a `ReversedProblem`,
+    so heuristics that measure the distance to `problem.goal` work in both directions.
 
-    while not pq.isEmpty():
-        current_state, path, current_cost = pq.pop()
+    The cheapest path through any state reached from both sides is remembered,
+    and the search stops once the smallest f-value of either frontier can not beat it.
+    With an admissible heuristic the returned path is optimal.
+    """
 
-        if current_state in visited:
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    start = problem.startingState()
+    if problem.isGoal(start):
+        return []
+
+    reversedProblem = ReversedProblem(problem)
+    counter = itertools.count()
+
+    sides = []
+    for root, heuristicProblem in ((start, problem), (problem.goal, reversedProblem)):
+        nodes = SearchNodes()
+        best = {root: nodes.add(root)}
+        frontier = [(heuristic(root, heuristicProblem), next(counter), best[root])]
+        sides.append((nodes, best, frontier, heuristicProblem))
+
+    stats.recordPush()
+    stats.recordPush()
+
+    bestCost = float('inf')
+    meeting = None
+
+    while sides[0][2] and sides[1][2]:
+        if max(sides[0][2][0][0], sides[1][2][0][0]) >= bestCost:
+            break
+
+        forward = len(sides[0][2]) <= len(sides[1][2])
+        nodes, best, frontier, heuristicProblem = sides[0 if forward else 1]
+        otherNodes, otherBest = sides[1 if forward else 0][:2]
+
+        _, _, node = heapq.heappop(frontier)
+        stats.recordPop()
+
+        state = nodes.states[node]
+        if best[state] != node:
+            stats.stale += 1
             continue
 
-        visited.add(current_state)
+        stats.expanded += 1
+        if forward:
+            successors = problem.successorStates(state)
+        else:
+            successors = predecessorStates(problem, state)
+
+        cost = nodes.costs[node]
+        for successor, action, step_cost in successors:
+            new_cost = cost + step_cost
+            if successor in best and new_cost >= nodes.costs[best[successor]]:
+                stats.dominated += 1
+                continue
+
+            child = nodes.add(successor, node, action, new_cost)
+            best[successor] = child
+            heapq.heappush(frontier,
+                    (new_cost + heuristic(successor, heuristicProblem), next(counter), child))
+            stats.recordPush()
+
+            if successor in otherBest:
+                total = new_cost + otherNodes.costs[otherBest[successor]]
+                if total < bestCost:
+                    bestCost = total
+                    meeting = successor
+
+    if meeting is None:
+        return []
+
+    forwardNodes, forwardBest = sides[0][:2]
+    backwardNodes, backwardBest = sides[1][:2]
+    return _stitch(forwardNodes, forwardBest[meeting], backwardNodes, backwardBest[meeting])
+
+def _stitch(forwardNodes, forwardNode, backwardNodes, backwardNode):
+    """
+    Join the path from the start to a meeting state with the path from that state to the goal.
+    Backward nodes store the action that leads from them towards the goal.
+    """
+
+    return forwardNodes.path(forwardNode) + list(reversed(backwardNodes.path(backwardNode)))
+
+def iterativeDeepeningAStarSearch(problem, heuristic):
+    """
+    IDA*: repeated depth first searches that only follow nodes with f = g + h below a bound,
+    raising the bound to the smallest f that exceeded it after each pass.
+    Only the current path is kept in memory, and states already on the path are not revisited.
+    With an admissible heuristic the returned path is optimal.
+    The longest path held in memory is reported as `problem.searchStats.peakFrontier`.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    start = problem.startingState()
+    if problem.isGoal(start):
+        return []
+
+    bound = heuristic(start, problem)
+
+    while bound < float('inf'):
+        nextBound = float('inf')
+
+        pathStates = [start]
+        onPath = {start}
+        actions = []
+        costs = [0]
+        successors = [iter(problem.successorStates(start))]
+        stats.expanded += 1
+
+        while successors:
+            try:
+                successor, action, step_cost = next(successors[-1])
+            except StopIteration:
+                successors.pop()
+                onPath.discard(pathStates.pop())
+                costs.pop()
+                if actions:
+                    actions.pop()
+
+                continue
+
+            if successor in onPath:
+                continue
+
+            new_cost = costs[-1] + step_cost
+            total_cost = new_cost + heuristic(successor, problem)
+            if total_cost > bound:
+                nextBound = min(nextBound, total_cost)
+                continue
+
+            pathStates.append(successor)
+            onPath.add(successor)
+            actions.append(action)
+            costs.append(new_cost)
+            stats.peakFrontier = max(stats.peakFrontier, len(pathStates))
+
+            if problem.isGoal(successor):
+                logging.debug('Search finished: %s.' % (stats))
+                return actions
+
+            successors.append(iter(problem.successorStates(successor)))
+            stats.expanded += 1
+
+        bound = nextBound
+
+    logging.debug('Search failed: %s.' % (stats))
+    return []
 
-        if problem.isGoal(current_state):
-            return path
+class BoundedNode(object):
+    """
+    A node of the tree kept by `memoryBoundedAStarSearch`.
+    """
+
+    __slots__ = ('state', 'parent', 'action', 'cost', 'value', 'depth',
+            'children', 'forgotten', 'inMemory', 'version')
+
+    def __init__(self, state, parent, action, cost, value):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+        self.value = value
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.children = []
+        self.forgotten = float('inf')
+        self.inMemory = True
+        self.version = 0
+
+    def path(self):
+        actions = []
+        node = self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+
+        actions.reverse()
+        return actions
+
+def memoryBoundedAStarSearch(problem, heuristic, maxNodes = 100000):
+    """
+    A simplified SMA*: A* that never keeps (much) more than `maxNodes` nodes in memory.
+
+    When memory is full, the leaf with the highest f-value (the shallowest one on ties) is dropped,
+    and its parent remembers the best f-value among its forgotten children.
+    A parent whose children were all dropped goes back on the frontier with that value,
+    and regenerates its children if the search comes back to it.
+    f-values are backed up from children to parents, and children never get a smaller f than
+    their parent (pathmax), so the search stays optimal with an admissible heuristic as long as
+    the optimal path fits in memory.
+    Since all successors of a node are generated together, memory can briefly exceed the cap
+    by the branching factor.
+    The most nodes held in memory at once is reported as `problem.searchStats.peakFrontier`.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    counter = itertools.count()
+    best = []
+    worst = []
+    inMemory = {}
+    nodeCount = [0]
+
+    def addLeaf(node):
+        node.version += 1
+        heapq.heappush(best, (node.value, -node.depth, next(counter), node.version, node))
+        heapq.heappush(worst, (-node.value, node.depth, next(counter), node.version, node))
+
+    def isCurrentLeaf(entry):
+        node = entry[-1]
+        return node.inMemory and not node.children and entry[-2] == node.version
+
+    def remember(node):
+        nodeCount[0] += 1
+        stats.peakFrontier = max(stats.peakFrontier, nodeCount[0])
+
+        other = inMemory.get(node.state)
+        if other is None or other.cost > node.cost:
+            inMemory[node.state] = node
+
+    def forget(node):
+        node.inMemory = False
+        nodeCount[0] -= 1
+
+        if inMemory.get(node.state) is node:
+            del inMemory[node.state]
+
+        parent = node.parent
+        parent.children.remove(node)
+        parent.forgotten = min(parent.forgotten, node.value)
+
+        if not parent.children:
+            parent.value = parent.forgotten
+            addLeaf(parent)
+
+    def backup(node):
+        while node is not None and node.children:
+            value = min(min(child.value for child in node.children), node.forgotten)
+            if value == node.value:
+                break
+
+            node.value = value
+            node = node.parent
+
+    start = problem.startingState()
+    root = BoundedNode(start, None, None, 0, heuristic(start, problem))
+    remember(root)
+    addLeaf(root)
+
+    while best:
+        entry = heapq.heappop(best)
+        if not isCurrentLeaf(entry):
+            continue
 
-        for successor, action, step_cost in problem.successorStates(current_state):
-            if successor not in visited:
-                new_cost = current_cost + step_cost
-                heuristic_cost = heuristic(successor, problem)
-                total_cost = new_cost + heuristic_cost
+        node = entry[-1]
+        if node.value == float('inf'):
+            break
+
+        if problem.isGoal(node.state):
+            logging.debug('Search finished: %s.' % (stats))
+            return node.path()
+
+        if node.depth + 1 >= maxNodes:
+            node.value = float('inf')
+            addLeaf(node)
+            backup(node.parent)
+            continue
 
-                pq.push((successor, path + [action], new_cost), total_cost)
+        stats.expanded += 1
+        node.forgotten = float('inf')
 
+        for successor, action, step_cost in problem.successorStates(node.state):
+            new_cost = node.cost + step_cost
+
+            other = inMemory.get(successor)
+            if other is not None and other.cost <= new_cost:
+                stats.dominated += 1
+                continue
+
+            value = max(node.value, new_cost + heuristic(successor, problem))
+            child = BoundedNode(successor, node, action, new_cost, value)
+
+            node.children.append(child)
+            remember(child)
+            addLeaf(child)
+
+        if node.children:
+            backup(node)
+        else:
+            node.value = float('inf')
+            addLeaf(node)
+            backup(node.parent)
+
+        # Drop the worst leaves, but never the one that would be expanded next.
+        while nodeCount[0] > maxNodes and worst:
+            while best and not isCurrentLeaf(best[0]):
+                heapq.heappop(best)
+
+            victim = heapq.heappop(worst)
+            if not isCurrentLeaf(victim):
+                continue
+
+            victimNode = victim[-1]
+            if victimNode.parent is None or (best and best[0][-1] is victimNode):
+                addLeaf(victimNode)
+                break
+
+            forget(victimNode)
+
+    logging.debug('Search failed: %s.' % (stats))
     return []
+
+def anytimeAStarSolutions(problem, heuristic, weight = 3.0, weightStep = 0.5, timeLimit = None):
+    """
+    Anytime repairing A* (ARA*) as a generator of (actions, bound) pairs.
+
+    A first plan is found quickly with the heuristic inflated by `weight`.
+    The weight is then lowered by `weightStep` towards 1,
+    and every pass reuses the search effort of the previous ones
+    (only states whose cost improved since they were expanded are reopened).
+    Each time a cheaper plan (or a tighter bound) is found it is yielded,
+    together with a bound on how many times more expensive than optimal it can be.
+    A bound of 1 means the plan is optimal (with an admissible heuristic).
+
+    If `timeLimit` (in seconds) is given, the generator stops once it runs out,
+    even in the middle of a pass.
+    """
+
+    stats = SearchStats()
+    problem.searchStats = stats
+
+    deadline = None if timeLimit is None else time.perf_counter() + timeLimit
+    counter = itertools.count()
+
+    heuristicValues = {}
+
+    def h(state):
+        if state not in heuristicValues:
+            heuristicValues[state] = heuristic(state, problem)
+
+        return heuristicValues[state]
+
+    nodes = SearchNodes()
+    start = problem.startingState()
+    bestNode = {start: nodes.add(start)}
+
+    goalNode = None
+    goalCost = float('inf')
+    if problem.isGoal(start):
+        yield [], 1.0
+        return
+
+    frontier = [(weight * h(start), next(counter), bestNode[start])]
+    closed = set()
+    inconsistent = set()
+
+    lastCost = float('inf')
+    lastBound = float('inf')
+
+    while True:
+        # Improve the path until no frontier entry can beat the current plan under this weight.
+        while frontier and goalCost > frontier[0][0]:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+
+            _, _, node = heapq.heappop(frontier)
+            state = nodes.states[node]
+            if bestNode[state] != node or state in closed:
+                stats.stale += 1
+                continue
+
+            closed.add(state)
+            stats.expanded += 1
+
+            cost = nodes.costs[node]
+            for successor, action, step_cost in problem.successorStates(state):
+                new_cost = cost + step_cost
+                if successor in bestNode and new_cost >= nodes.costs[bestNode[successor]]:
+                    stats.dominated += 1
+                    continue
+
+                child = nodes.add(successor, node, action, new_cost)
+                bestNode[successor] = child
+
+                if problem.isGoal(successor):
+                    if new_cost < goalCost:
+                        goalCost = new_cost
+                        goalNode = child
+
+                    continue
+
+                if successor in closed:
+                    inconsistent.add(successor)
+                else:
+                    heapq.heappush(frontier, (new_cost + weight * h(successor), next(counter), child))
+                    stats.recordPush()
+
+        if goalNode is None:
+            return
+
+        # The frontier still holds stale entries (for states reached more cheaply, or already expanded),
+        # so only the live ones are open.
+        opened = {nodes.states[node] for _, _, node in frontier
+                if bestNode[nodes.states[node]] == node and nodes.states[node] not in closed}
+
+        lowerBound = min((nodes.costs[bestNode[state]] + h(state) for state in opened | inconsistent),
+                default = float('inf'))
+        bound = max(1.0, min(weight, goalCost / lowerBound if lowerBound > 0 else weight))
+
+        if goalCost < lastCost or bound < lastBound:
+            lastCost = goalCost
+            lastBound = bound
+            logging.debug('Anytime search: cost %s, bound %.3f: %s.' % (goalCost, bound, stats))
+            yield nodes.path(goalNode), bound
+
+        if weight <= 1.0 or bound <= 1.0:
+            return
+
+        # Tighten the weight, and rebuild the frontier from the open and the inconsistent states.
+        weight = max(1.0, weight - weightStep)
+        frontier = [(nodes.costs[bestNode[state]] + weight * h(state), next(counter), bestNode[state])
+                for state in opened | inconsistent]
+        heapq.heapify(frontier)
+        inconsistent = set()
+        closed = set()
+
+def anytimeAStarSearch(problem, heuristic, timeLimit = 1.0):
+    """
+    Run `anytimeAStarSolutions` for at most `timeLimit` seconds and return the best plan found
+    (an empty list if there was not enough time to find any plan).
+    """
+
+    actions = []
+    for actions, bound in anytimeAStarSolutions(problem, heuristic, timeLimit = timeLimit):
+        pass
+
+    return actions
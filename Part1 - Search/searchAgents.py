@@ -5,17 +5,77 @@ You will complete their implementations.
 Good luck and happy searching!
 """
 
+import collections
+import heapq
+import inspect
 import logging
 import random
 from pacai.core.actions import Actions
-from pacai.core.search import heuristic
 from pacai.core.search.position import PositionSearchProblem
 from pacai.core.search.problem import SearchProblem
 from pacai.agents.base import BaseAgent
 from pacai.agents.search.base import SearchAgent
 from pacai.core.directions import Directions
 from pacai.core.distance import manhattan
-from pacai.student.search import breadthFirstSearch
+from pacai.student.distanceField import distanceAt
+from pacai.student.distanceField import distanceField
+from pacai.student.distanceTable import getDistanceTable
+from pacai.student.distanceTable import openCells
+from pacai.student.planCache import getPlanCache
+from pacai.student.planCache import planFits
+from pacai.student.planCache import planKey
+from pacai.student.search import aStarSearch
+
+FOOD_HEURISTIC_CACHE_SIZE = 100000
+
+class LRUCache(object):
+    """
+    A dictionary with a maximum size that evicts its least recently used entry when full.
+    Keeps count of cache hits and misses.
+    """
+
+    def __init__(self, maxSize):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, default = None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.maxSize:
+            self._entries.popitem(last = False)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return 'LRUCache(size: %d/%d, hits: %d, misses: %d)' % (len(self._entries),
+                self.maxSize, self.hits, self.misses)
+
+def foodBitmask(foodList, height):
+    """
+    Pack a list of food positions into an int, one bit per (x, y) cell.
+    """
+
+    mask = 0
+    for x, y in foodList:
+        mask |= 1 << (x * height + y)
+
+    return mask
 
 class CornersProblem(SearchProblem):
     """
@@ -93,10 +153,19 @@ def cornersHeuristic(state, problem):
     position, visited_corners = state
 
     unvisited_corners = [corner for corner, visited in zip(corners, visited_corners) if not visited]
-    
+
+    return cornerTourDistance(position, unvisited_corners)
+
+def cornerTourDistance(position, unvisited_corners):
+    """
+    The length of the greedy nearest-corner tour (by Manhattan distance)
+    from a position through all of the given corners.
+    """
+
     if not unvisited_corners:
         return 0
 
+    unvisited_corners = list(unvisited_corners)
     total_distance = 0
     current_pos = position
 
@@ -111,7 +180,6 @@ def cornersHeuristic(state, problem):
         unvisited_corners.pop(nearest_corner_index)
 
     return total_distance
-    return heuristic.null(state, problem)
 
 def foodHeuristic(state, problem):
     """
@@ -147,54 +215,598 @@ def foodHeuristic(state, problem):
     foodList = foodGrid.asList()
     if not foodList:
         return 0
-   
+
+    return cachedFoodValue(problem, position, foodList, foodBitmask(foodList, foodGrid.getHeight()))
+
+def cachedFoodValue(problem, position, foodList, foodMask):
+    """
+    The value of `foodHeuristic`: the largest Manhattan distance between two remaining foods
+    plus the Manhattan distance to the closest food.
+
+    Both the full value (per position and food set) and the food-only component (per food set)
+    are cached, since A* evaluates the same food configuration from many positions.
+    `foodMask` is any int that uniquely identifies the remaining food.
+    """
+
+    if 'foodHeuristicCache' not in problem.heuristicInfo:
+        problem.heuristicInfo['foodHeuristicCache'] = LRUCache(FOOD_HEURISTIC_CACHE_SIZE)
+        problem.heuristicInfo['foodSpanCache'] = LRUCache(FOOD_HEURISTIC_CACHE_SIZE)
+
+    valueCache = problem.heuristicInfo['foodHeuristicCache']
+    spanCache = problem.heuristicInfo['foodSpanCache']
+
+    value = valueCache.get((position, foodMask))
+    if value is not None:
+        return value
+
     min_distance = float('inf')
     for food in foodList:
         distance = manhattan(position, food)
         if distance < min_distance:
             min_distance = distance
 
-    maxFoodDistance = 0
-    for i in range(len(foodList) - 1):
-        for j in range(i + 1, len(foodList)):
-            foodDistance = manhattan(foodList[i], foodList[j])
-            if foodDistance > maxFoodDistance:
-                maxFoodDistance = foodDistance
+    maxFoodDistance = spanCache.get(foodMask)
+    if maxFoodDistance is None:
+        maxFoodDistance = 0
+        for i in range(len(foodList) - 1):
+            for j in range(i + 1, len(foodList)):
+                foodDistance = manhattan(foodList[i], foodList[j])
+                if foodDistance > maxFoodDistance:
+                    maxFoodDistance = foodDistance
+
+        spanCache.put(foodMask, maxFoodDistance)
+
+    value = maxFoodDistance + min_distance
+    valueCache.put((position, foodMask), value)
+
+    return value
+
+class CellTable(object):
+    """
+    Numbers the open cells of a wall grid (in the same order as `pacai.student.distanceTable`)
+    and precomputes the (neighbor cell, action) pairs of every cell,
+    so that expanding a position is a single list lookup.
+    """
+
+    def __init__(self, walls):
+        self.positions = openCells(walls)
+        self.cellIds = {position: index for index, position in enumerate(self.positions)}
+        self.successors = []
+
+        for x, y in self.positions:
+            cellSuccessors = []
+            for action in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+                dx, dy = Actions.directionToVector(action)
+                nextPosition = (int(x + dx), int(y + dy))
+                if nextPosition in self.cellIds:
+                    cellSuccessors.append((self.cellIds[nextPosition], action))
+
+            self.successors.append(tuple(cellSuccessors))
+
+def maskPositions(mask, positions):
+    """
+    Get the positions of all the cells whose bit is set in a cell bitmask.
+    """
+
+    result = []
+    while mask:
+        lowestBit = mask & -mask
+        result.append(positions[lowestBit.bit_length() - 1])
+        mask ^= lowestBit
+
+    return result
+
+class CompactCornersProblem(SearchProblem):
+    """
+    The same search problem as `CornersProblem`, but with a compact state encoding.
+    A state is (cell id, corner bitmask), where bit i of the mask is set once corner i was visited.
+    Successors come from a precomputed per-cell table.
+    """
+
+    def __init__(self, startingGameState):
+        super().__init__()
+        self.walls = startingGameState.getWalls()
+        self.startingPosition = startingGameState.getPacmanPosition()
+        top = self.walls.getHeight() - 2
+        right = self.walls.getWidth() - 2
+        self.corners = ((1, 1), (1, top), (right, 1), (right, top))
+
+        for corner in self.corners:
+            if not startingGameState.hasFood(*corner):
+                logging.warning(f"Warning: no food in corner {corner}")
+
+        self.cells = CellTable(self.walls)
+        self.cornerBits = {self.cells.cellIds[corner]: 1 << index
+                for index, corner in enumerate(self.corners) if corner in self.cells.cellIds}
+        self.allCorners = (1 << len(self.corners)) - 1
+
+        self.startState = (self.cells.cellIds[self.startingPosition], 0)
+
+    def startingState(self):
+        return self.startState
+
+    def isGoal(self, state):
+        return state[1] == self.allCorners
+
+    def successorStates(self, state):
+        cell, visitedMask = state
+        cornerBits = self.cornerBits
+
+        self._numExpanded += 1
+        return [((nextCell, visitedMask | cornerBits.get(nextCell, 0)), action, 1)
+                for nextCell, action in self.cells.successors[cell]]
+
+    def actionsCost(self, actions):
+        return CornersProblem.actionsCost(self, actions)
+
+def compactCornersHeuristic(state, problem):
+    """
+    `cornersHeuristic` for the `CompactCornersProblem`, read straight from the corner bitmask.
+    """
+
+    cell, visitedMask = state
+    unvisited_corners = [corner for index, corner in enumerate(problem.corners)
+            if not (visitedMask >> index) & 1]
+
+    return cornerTourDistance(problem.cells.positions[cell], unvisited_corners)
+
+class CompactFoodSearchProblem(SearchProblem):
+    """
+    The same search problem as `pacai.core.search.food.FoodSearchProblem`,
+    but with a compact state encoding.
+    A state is (cell id, food bitmask), where bit i of the mask is set if cell i still has food.
+    Successors come from a precomputed per-cell table.
+    """
+
+    def __init__(self, startingGameState):
+        super().__init__()
+        self.walls = startingGameState.getWalls()
+        self.startingGameState = startingGameState
+        self.heuristicInfo = {}
+
+        self.cells = CellTable(self.walls)
+
+        foodMask = 0
+        for food in startingGameState.getFood().asList():
+            foodMask |= 1 << self.cells.cellIds[food]
+
+        self.startingPosition = startingGameState.getPacmanPosition()
+        self.start = (self.cells.cellIds[self.startingPosition], foodMask)
+
+    def startingState(self):
+        return self.start
+
+    def isGoal(self, state):
+        return state[1] == 0
+
+    def successorStates(self, state):
+        cell, foodMask = state
+
+        self._numExpanded += 1
+        return [((nextCell, foodMask & ~(1 << nextCell)), action, 1)
+                for nextCell, action in self.cells.successors[cell]]
+
+    def actionsCost(self, actions):
+        x, y = self.startingPosition
+        for action in actions:
+            dx, dy = Actions.directionToVector(action)
+            x, y = int(x + dx), int(y + dy)
+            if self.walls[x][y]:
+                return 999999
+
+        return len(actions)
+
+    def getFoodPositions(self, state):
+        return maskPositions(state[1], self.cells.positions)
+
+def compactFoodHeuristic(state, problem):
+    """
+    `foodHeuristic` for the `CompactFoodSearchProblem`.
+    The food bitmask in the state is used directly as the cache key.
+    """
+
+    cell, foodMask = state
+    if not foodMask:
+        return 0
+
+    foodList = maskPositions(foodMask, problem.cells.positions)
+    return cachedFoodValue(problem, problem.cells.positions[cell], foodList, foodMask)
+
+class FoodMST(object):
+    """
+    Minimum spanning trees over the remaining food of a food search problem,
+    weighted by true maze distance (from `pacai.student.distanceTable`).
+
+    Food sets are cell bitmasks (as in `CompactFoodSearchProblem`).
+    Since a child state has at most one less food than its parent,
+    a child's tree is derived from its parent's cached tree whenever the eaten food was a leaf:
+    removing a leaf from an MST leaves an MST of the remaining food.
+    Otherwise the tree is rebuilt with Prim's algorithm.
+    """
+
+    def __init__(self, walls, cells, foodCells):
+        self.cells = cells
+        self.foodCells = list(foodCells)
+        self.foodIndex = {cell: index for index, cell in enumerate(self.foodCells)}
+
+        self.table = getDistanceTable(walls)
+        self.pairwise = [self.table.distances[cell][self.foodCells].tolist()
+                for cell in self.foodCells]
+
+        self.trees = LRUCache(FOOD_HEURISTIC_CACHE_SIZE)
+        self.incremental = 0
+        self._cellDistances = {}
+
+    def getFoodDistances(self, cell):
+        """
+        The maze distance from a cell to each of the initial foods (by food index).
+        """
+
+        distances = self._cellDistances.get(cell)
+        if distances is None:
+            distances = self.table.distances[cell][self.foodCells].tolist()
+            self._cellDistances[cell] = distances
+
+        return distances
+
+    def getFoodIndexes(self, foodMask):
+        foodIndex = self.foodIndex
+        return [foodIndex[cell] for cell in maskCells(foodMask)]
+
+    def getTree(self, foodMask, eatenCell = None):
+        """
+        Get the (weight, edges) MST of a food set,
+        where the edges are (food index, food index, distance) tuples.
+        If given, `eatenCell` is the cell whose food was just eaten to reach this food set.
+        """
+
+        tree = self.trees.get(foodMask)
+        if tree is not None:
+            return tree
+
+        if eatenCell is not None and eatenCell in self.foodIndex:
+            parentTree = self.trees.get(foodMask | (1 << eatenCell))
+            if parentTree is not None:
+                tree = self._removeLeaf(parentTree, self.foodIndex[eatenCell])
+
+        if tree is None:
+            tree = self._prim(self.getFoodIndexes(foodMask))
+        else:
+            self.incremental += 1
+
+        self.trees.put(foodMask, tree)
+        return tree
+
+    def _removeLeaf(self, tree, food):
+        weight, edges = tree
+
+        leafEdges = [edge for edge in edges if edge[0] == food or edge[1] == food]
+        if len(leafEdges) != 1:
+            return None
+
+        edge = leafEdges[0]
+        return (weight - edge[2], tuple(other for other in edges if other is not edge))
+
+    def _prim(self, foods):
+        if len(foods) <= 1:
+            return (0, ())
+
+        pairwise = self.pairwise
+        first = foods[0]
+        remaining = foods[1:]
+        bestDistance = {food: pairwise[first][food] for food in remaining}
+        bestParent = {food: first for food in remaining}
+
+        weight = 0
+        edges = []
+        while bestDistance:
+            food = min(bestDistance, key = bestDistance.get)
+            distance = bestDistance.pop(food)
+
+            weight += distance
+            edges.append((bestParent.pop(food), food, distance))
+
+            row = pairwise[food]
+            for other in bestDistance:
+                if row[other] < bestDistance[other]:
+                    bestDistance[other] = row[other]
+                    bestParent[other] = food
+
+        return (weight, tuple(edges))
+
+def maskCells(mask):
+    """
+    Get the indexes of the set bits of a bitmask.
+    """
+
+    result = []
+    while mask:
+        lowestBit = mask & -mask
+        result.append(lowestBit.bit_length() - 1)
+        mask ^= lowestBit
+
+    return result
+
+def foodMSTHeuristic(state, problem):
+    """
+    A consistent heuristic for both `pacai.core.search.food.FoodSearchProblem`
+    and `CompactFoodSearchProblem`:
+    the weight of the minimum spanning tree of the remaining food under maze distance,
+    plus the maze distance to the closest food.
+
+    Pacman has to at least walk to some food and then connect every remaining food,
+    and any walk that visits all of the food is at least as long as their spanning tree.
+    """
+
+    info = problem.heuristicInfo
+    if 'foodMST' not in info:
+        cells = getattr(problem, 'cells', None)
+        if cells is None:
+            cells = CellTable(problem.walls)
+
+        startState = problem.startingState()
+        if isinstance(startState[1], int):
+            foodCells = maskCells(startState[1])
+        else:
+            foodCells = [cells.cellIds[food] for food in startState[1].asList()]
+
+        info['foodMST'] = FoodMST(problem.walls, cells, foodCells)
+        info['foodMSTCache'] = LRUCache(FOOD_HEURISTIC_CACHE_SIZE)
+
+    mst = info['foodMST']
+    position, food = state
+
+    if isinstance(food, int):
+        cell, foodMask = position, food
+    else:
+        cell = mst.cells.cellIds[position]
+        foodMask = 0
+        for foodPosition in food.asList():
+            foodMask |= 1 << mst.cells.cellIds[foodPosition]
+
+    if not foodMask:
+        return 0
+
+    valueCache = info['foodMSTCache']
+    value = valueCache.get((cell, foodMask))
+    if value is not None:
+        return value
+
+    weight, edges = mst.getTree(foodMask, cell)
+    distances = mst.getFoodDistances(cell)
+    nearest = min(distances[food] for food in mst.getFoodIndexes(foodMask))
+
+    value = weight + nearest
+    valueCache.put((cell, foodMask), value)
+
+    return value
+
+class NearestFoodField(object):
+    """
+    A reusable multi-source BFS distance field from every open cell to its closest food.
+
+    Every cell remembers its distance to, and the cell of, its closest food.
+    When a food is eaten, only the cells that were closest to that food are repaired
+    (by a Dijkstra pass seeded from their still valid neighbors),
+    instead of running a new search for every dot.
+    The path to the closest food is then just a walk down the distance field.
+    """
+
+    def __init__(self, walls, foodPositions):
+        self.cells = CellTable(walls)
+        self.distances = [float('inf')] * len(self.cells.positions)
+        self.owners = [None] * len(self.cells.positions)
+        self.regions = {}
+
+        fringe = collections.deque()
+        for position in foodPositions:
+            cell = self.cells.cellIds[position]
+            self.distances[cell] = 0
+            self.owners[cell] = cell
+            self.regions[cell] = {cell}
+            fringe.append(cell)
+
+        while fringe:
+            cell = fringe.popleft()
+            for nextCell, _ in self.cells.successors[cell]:
+                if self.distances[nextCell] == float('inf'):
+                    self.distances[nextCell] = self.distances[cell] + 1
+                    self.owners[nextCell] = self.owners[cell]
+                    self.regions[self.owners[cell]].add(nextCell)
+                    fringe.append(nextCell)
+
+    def hasFood(self):
+        return len(self.regions) > 0
+
+    def getFoodPositions(self):
+        return [self.cells.positions[cell] for cell in self.regions]
+
+    def removeFood(self, position):
+        """
+        Mark the food at a position as eaten and repair the distance field.
+        """
+
+        food = self.cells.cellIds[position]
+        if food not in self.regions:
+            return
+
+        region = self.regions.pop(food)
+        for cell in region:
+            self.distances[cell] = float('inf')
+            self.owners[cell] = None
+
+        heap = []
+        for cell in region:
+            for nextCell, _ in self.cells.successors[cell]:
+                if self.owners[nextCell] is not None:
+                    heapq.heappush(heap, (self.distances[nextCell] + 1, cell, self.owners[nextCell]))
+
+        while heap:
+            distance, cell, owner = heapq.heappop(heap)
+            if distance >= self.distances[cell]:
+                continue
+
+            self.distances[cell] = distance
+            self.owners[cell] = owner
+            self.regions[owner].add(cell)
+
+            for nextCell, _ in self.cells.successors[cell]:
+                if distance + 1 < self.distances[nextCell]:
+                    heapq.heappush(heap, (distance + 1, nextCell, owner))
+
+    def pathToClosestFood(self, position):
+        """
+        Get the actions that lead from a position to its closest food,
+        or None if no food is reachable.
+        """
+
+        cell = self.cells.cellIds[position]
+        if self.distances[cell] == float('inf'):
+            return None
+
+        actions = []
+        while self.distances[cell] > 0:
+            for nextCell, action in self.cells.successors[cell]:
+                if self.distances[nextCell] == self.distances[cell] - 1:
+                    actions.append(action)
+                    cell = nextCell
+                    break
+
+        return actions
 
-    return maxFoodDistance + min_distance
-    return heuristic.null(state, problem)
+def cachedPlan(cache, state, walls, key):
+    """
+    Get a plan from a `pacai.student.planCache.PlanCache`, or None.
+    A plan that does not fit the layout means the cache is stale,
+    so every plan for the layout is dropped.
+    """
+
+    actions = cache.get(key)
+    if actions is not None and not planFits(state, actions):
+        logging.warning('Cached plan walks into a wall, dropping the cached plans for this layout.')
+        cache.invalidate(walls)
+        return None
+
+    return actions
+
+class CachedSearchAgent(SearchAgent):
+    """
+    A `pacai.agents.search.base.SearchAgent` that keeps its plans in a `pacai.student.planCache`,
+    so a game on a layout (and food and start) it has already solved starts without searching.
+    Takes the same arguments as `SearchAgent`, plus `cachePath` and `maxEntries` for the cache
+    (an already open cache keeps its limit if `maxEntries` is not given).
+    """
+
+    def __init__(self, index, cachePath = None, maxEntries = None, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._cache = getPlanCache(cachePath, maxEntries)
+
+        # Name the plan after the search that SearchAgent actually runs (its defaults included).
+        parameters = inspect.signature(SearchAgent.__init__).parameters
+        self._planName = ':'.join(str(kwargs.get(name, parameters[name].default))
+                for name in ('fn', 'prob', 'heuristic'))
+
+    def registerInitialState(self, state):
+        walls, key = planKey(state, self._planName)
+
+        actions = cachedPlan(self._cache, state, walls, key)
+        if actions is not None:
+            logging.info('Using cached plan with %d actions.' % len(actions))
+            self._actions = actions
+            self._actionIndex = 0
+            return
+
+        super().registerInitialState(state)
+        self._cache.put(key, walls, self._actions)
 
 class ClosestDotSearchAgent(SearchAgent):
     """
     Search for all food using a sequence of searches.
+
+    The searches are answered by a `NearestFoodField` that is built once and updated as food is eaten.
+    By default the whole plan is made in `ClosestDotSearchAgent.registerInitialState`.
+    With `lazy` set (e.g. `--agent-args lazy=true`), only the next path segment is planned,
+    on demand in `ClosestDotSearchAgent.getAction`.
+    With `cachePlans` set, whole plans are kept in a `pacai.student.planCache` between runs
+    (at `cachePath`, holding at most `maxEntries` plans, as for `CachedSearchAgent`).
     """
 
-    def __init__(self, index, **kwargs):
+    def __init__(self, index, lazy = False, cachePlans = False, cachePath = None, maxEntries = None,
+            **kwargs):
         super().__init__(index, **kwargs)
 
+        self.lazy = str(lazy).lower() in ('true', '1', 'yes')
+        self.cachePlans = str(cachePlans).lower() in ('true', '1', 'yes')
+        self._field = None
+        self._cache = None
+        if self.cachePlans:
+            self._cache = getPlanCache(cachePath, maxEntries)
+
     def registerInitialState(self, state):
         self._actions = []
         self._actionIndex = 0
 
-        currentState = state
+        self._field = NearestFoodField(state.getWalls(), state.getFood().asList())
+        if self.lazy:
+            return
 
-        while (currentState.getFood().count() > 0):
-            nextPathSegment = self.findPathToClosestDot(currentState)
-            self._actions += nextPathSegment
+        if self.cachePlans:
+            walls, key = planKey(state, 'ClosestDotSearchAgent')
+            actions = cachedPlan(self._cache, state, walls, key)
+            if actions is not None:
+                logging.info('Using cached path with cost %d.' % len(actions))
+                self._actions = actions
+                return
 
-            for action in nextPathSegment:
-                legal = currentState.getLegalActions()
-                if action not in legal:
-                    raise Exception('findPathToClosestDot returned an illegal move: %s!\n%s' %
-                            (str(action), str(currentState)))
+        position = state.getPacmanPosition()
+        while self._field.hasFood():
+            nextPathSegment, position = self._planSegment(position)
+            if nextPathSegment is None:
+                break
 
-                currentState = currentState.generateSuccessor(0, action)
+            self._actions += nextPathSegment
 
         logging.info('Path found with cost %d.' % len(self._actions))
 
+        if self.cachePlans:
+            self._cache.put(key, walls, self._actions)
+
+    def getAction(self, state):
+        if self.lazy and self._actionIndex >= len(self._actions):
+            food = state.getFood()
+            for x, y in self._field.getFoodPositions():
+                if not food[x][y]:
+                    self._field.removeFood((x, y))
+
+            nextPathSegment, _ = self._planSegment(state.getPacmanPosition())
+            self._actions = nextPathSegment or []
+            self._actionIndex = 0
+
+        return super().getAction(state)
+
+    def _planSegment(self, position):
+        """
+        Get the path to the closest food from a position and the position of that food,
+        which is then removed from the field.
+        The path never passes over other food, since that food would have been closer.
+        """
+
+        nextPathSegment = self._field.pathToClosestFood(position)
+        if nextPathSegment is None:
+            return None, position
+
+        for action in nextPathSegment:
+            position = Actions.getSuccessor(position, action)
+
+        position = (int(position[0]), int(position[1]))
+        self._field.removeFood(position)
+
+        return nextPathSegment, position
+
     def findPathToClosestDot(self, gameState):
         problem = AnyFoodSearchProblem(gameState)
-        return breadthFirstSearch(problem)
+        return aStarSearch(problem, anyFoodHeuristic)
 
 class AnyFoodSearchProblem(PositionSearchProblem):
     """
@@ -221,6 +833,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         super().__init__(gameState, goal = None, start = start)
 
         self.food = gameState.getFood()
+        self.foodField = None
     
     def isGoal(self, state):
         x, y = state
@@ -239,7 +852,18 @@ class AnyFoodSearchProblem(PositionSearchProblem):
                 return float('inf')
             cost += 1
         return cost
-    
+
+def anyFoodHeuristic(state, problem):
+    """
+    The exact maze distance to the closest food,
+    read from a `pacai.student.distanceField` seeded from every food (built once per problem).
+    """
+
+    if problem.foodField is None:
+        problem.foodField = distanceField(problem.walls, problem.food.asList())
+
+    return distanceAt(problem.foodField, state)
+
 class MySearchAgent(BaseAgent):
     def __init__(self, index, **kwargs):
         super().__init__(index, **kwargs)
@@ -260,4 +884,4 @@ class MySearchAgent(BaseAgent):
         if Directions.STOP in legal_actions:
             legal_actions.remove(Directions.STOP)
 
-        return random.choice(legal_actions) if legal_actions else Directions.STOP
\ No newline at end of file
+        return random.choice(legal_actions) if legal_actions else Directions.STOP
@@ -0,0 +1,180 @@
+"""
+Solve many search problems offline over a pool of worker processes.
+
+The manifest is a JSON lines file with one job per line:
+```
+{"id": "c1", "layout": "mediumCorners", "problem": "corners", "algorithm": "astar", "heuristic": "corners"}
+{"layout": "trickySearch", "problem": "food", "start": [5, 3], "algorithm": "ucs"}
+```
+`problem`, `algorithm`, and `heuristic` are names from `pacai.student.searchBenchmark`.
+`start` (Pacman's starting position), `heuristic`, and `id` are optional.
+Jobs without an id are identified by all of their other fields.
+
+Results are appended to the output file as JSON lines as soon as each job finishes,
+with the same fields as a benchmark run plus `id`, `start`, and `actions`
+(or `error` if the job failed).
+If the output file already exists, the jobs that already have a result in it are skipped,
+so an interrupted batch can just be started again.
+
+Example:
+```
+python -m pacai.student.searchBatch jobs.jsonl --output results.jsonl --processes 8
+```
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+from pacai.student import searchBenchmark
+
+def jobId(job):
+    if 'id' in job:
+        return str(job['id'])
+
+    start = job.get('start')
+    start = '-' if start is None else '%d,%d' % (start[0], start[1])
+
+    return '%s/%s/%s/%s/%s' % (job['problem'], job['layout'], start,
+            job['algorithm'], job.get('heuristic'))
+
+def readManifest(path):
+    """
+    Read and check the jobs of a manifest file.
+    """
+
+    jobs = []
+    with open(path, 'r') as file:
+        for lineNumber, line in enumerate(file, 1):
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+
+            job = json.loads(line)
+            for key in ('layout', 'problem', 'algorithm'):
+                if key not in job:
+                    raise ValueError('%s:%d: Job is missing "%s".' % (path, lineNumber, key))
+
+            if job['problem'] not in searchBenchmark.PROBLEMS:
+                raise ValueError('%s:%d: Unknown problem: "%s".' % (path, lineNumber, job['problem']))
+
+            if job['algorithm'] not in searchBenchmark.ALGORITHMS:
+                raise ValueError('%s:%d: Unknown algorithm: "%s".'
+                        % (path, lineNumber, job['algorithm']))
+
+            heuristicName = job.get('heuristic')
+            if heuristicName is not None and heuristicName not in searchBenchmark.HEURISTICS:
+                raise ValueError('%s:%d: Unknown heuristic: "%s".'
+                        % (path, lineNumber, heuristicName))
+
+            jobs.append(job)
+
+    return jobs
+
+def readFinished(path):
+    """
+    Get the ids of the jobs that already have a successful result in an output file.
+    The file is rewritten without failed results and without a partially written last line,
+    so that new results can be appended to it safely.
+    """
+
+    if not os.path.exists(path):
+        return set()
+
+    finished = set()
+    kept = []
+
+    with open(path, 'r') as file:
+        for line in file:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue
+
+            if 'error' in result or result.get('id') is None:
+                continue
+
+            finished.add(result['id'])
+            kept.append(line if line.endswith('\n') else line + '\n')
+
+    tempPath = path + '.tmp'
+    with open(tempPath, 'w') as file:
+        file.writelines(kept)
+
+    os.replace(tempPath, path)
+    return finished
+
+def solveJob(job):
+    """
+    Solve one job (in a worker process) and return its result.
+    """
+
+    result = {'id': jobId(job), 'start': job.get('start')}
+
+    try:
+        run = searchBenchmark.runOne(job['problem'], job['layout'], job['algorithm'],
+                job.get('heuristic'), job.get('start'), keepActions = True)
+    except Exception as ex:
+        result['error'] = repr(ex)
+        return result
+
+    if run is None:
+        result['error'] = 'Could not find layout: %s.' % (job['layout'])
+        return result
+
+    result.update(run)
+    return result
+
+def runBatch(jobs, outputPath, processes = None):
+    """
+    Solve every job that does not have a result in the output file yet,
+    appending results to it as they come in.
+    Returns the number of jobs that failed.
+    """
+
+    finished = readFinished(outputPath)
+    pending = [job for job in jobs if jobId(job) not in finished]
+    logging.info('%d jobs, %d already done, %d to run.'
+            % (len(jobs), len(jobs) - len(pending), len(pending)))
+
+    if len(pending) == 0:
+        return 0
+
+    failures = 0
+    with open(outputPath, 'a') as file, multiprocessing.Pool(processes) as pool:
+        for count, result in enumerate(pool.imap_unordered(solveJob, pending), 1):
+            file.write(json.dumps(result) + '\n')
+            file.flush()
+
+            if 'error' in result:
+                failures += 1
+                logging.error('[%d/%d] %s: %s' % (count, len(pending), result['id'], result['error']))
+            else:
+                logging.info('[%d/%d] %s: cost %s, expanded %s, %.3fs.'
+                        % (count, len(pending), result['id'], result['cost'], result['expanded'],
+                            result['wallTime']))
+
+    return failures
+
+def main(argv):
+    parser = argparse.ArgumentParser(description = 'Solve a manifest of search problems in parallel.')
+    parser.add_argument('manifest',
+            help = 'A JSON lines file with one job per line.')
+    parser.add_argument('--output', default = 'searchBatch.jsonl',
+            help = 'Where to append the results (default: %(default)s).')
+    parser.add_argument('--processes', type = int, default = None,
+            help = 'The number of worker processes (default: one per CPU).')
+    options = parser.parse_args(argv)
+
+    logging.basicConfig(level = logging.INFO, format = '%(message)s')
+
+    jobs = readManifest(options.manifest)
+    failures = runBatch(jobs, options.output, options.processes)
+
+    return 1 if failures > 0 else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
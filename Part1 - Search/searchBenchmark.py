@@ -0,0 +1,319 @@
+"""
+A benchmark harness for the search functions and heuristics in this project.
+
+Every (problem type, layout, algorithm, heuristic) combination in the benchmark matrix is solved once,
+and the following are recorded for each run:
+nodes expanded, peak frontier size, heuristic calls,
+time spent in the heuristic, time spent generating successors, and total wall time.
+
+Results are written as JSON.
+If a baseline file is given, the new results are compared against it
+and the process exits with a non-zero status when a run got worse.
+
+Example:
+```
+python -m pacai.student.searchBenchmark --output bench.json
+python -m pacai.student.searchBenchmark --baseline bench.json --output new.json
+```
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.layout import getLayout
+from pacai.core.search import heuristic
+from pacai.core.search.food import FoodSearchProblem
+from pacai.core.search.position import PositionSearchProblem
+from pacai.student import corridorGraph
+from pacai.student import jumpPoints
+from pacai.student import search
+from pacai.student import searchAgents
+
+ALGORITHMS = {
+    'dfs': search.depthFirstSearch,
+    'bfs': search.breadthFirstSearch,
+    'ucs': search.uniformCostSearch,
+    'astar': search.aStarSearch,
+    'greedy': search.greedySearch,
+    'bidirectional': search.bidirectionalSearch,
+    'bidirectionalAstar': search.bidirectionalAStarSearch,
+    'idastar': search.iterativeDeepeningAStarSearch,
+    'smastar': search.memoryBoundedAStarSearch,
+    'anytime': search.anytimeAStarSearch,
+    'corridor': corridorGraph.corridorSearch,
+    'jps': jumpPoints.jumpPointSearch,
+}
+
+HEURISTICS = {
+    'null': heuristic.null,
+    'manhattan': heuristic.manhattan,
+    'corners': searchAgents.cornersHeuristic,
+    'food': searchAgents.foodHeuristic,
+    'compactCorners': searchAgents.compactCornersHeuristic,
+    'compactFood': searchAgents.compactFoodHeuristic,
+    'foodMST': searchAgents.foodMSTHeuristic,
+}
+
+PROBLEMS = {
+    'position': PositionSearchProblem,
+    'corners': searchAgents.CornersProblem,
+    'food': FoodSearchProblem,
+    'compactCorners': searchAgents.CompactCornersProblem,
+    'compactFood': searchAgents.CompactFoodSearchProblem,
+}
+
+# (problem type, layouts, [(algorithm, heuristic), ...])
+DEFAULT_MATRIX = [
+    ('position', ['tinyMaze', 'mediumMaze', 'bigMaze', 'openMaze'], [
+        ('dfs', None),
+        ('bfs', None),
+        ('ucs', None),
+        ('astar', 'null'),
+        ('astar', 'manhattan'),
+        ('greedy', 'manhattan'),
+        ('bidirectional', None),
+        ('bidirectionalAstar', 'manhattan'),
+        ('idastar', 'manhattan'),
+        ('smastar', 'manhattan'),
+        ('anytime', 'manhattan'),
+        ('corridor', None),
+        ('jps', None),
+    ]),
+    ('corners', ['tinyCorners', 'mediumCorners'], [
+        ('bfs', None),
+        ('ucs', None),
+        ('astar', 'null'),
+        ('astar', 'corners'),
+        ('smastar', 'corners'),
+        ('anytime', 'corners'),
+        # No IDA*: with only 4 corners to rank states, it re-expands the same states over and over.
+    ]),
+    ('food', ['testSearch', 'tinySearch', 'trickySearch'], [
+        ('ucs', None),
+        ('astar', 'null'),
+        ('astar', 'food'),
+        ('astar', 'foodMST'),
+    ]),
+    ('compactCorners', ['tinyCorners', 'mediumCorners'], [
+        ('astar', 'compactCorners'),
+    ]),
+    ('compactFood', ['testSearch', 'tinySearch', 'trickySearch'], [
+        ('astar', 'compactFood'),
+        ('astar', 'foodMST'),
+        ('smastar', 'foodMST'),
+        ('anytime', 'foodMST'),
+        ('idastar', 'foodMST'),
+    ]),
+]
+
+# The metrics that must not grow when compared against a baseline, and how much they may grow.
+# Time based metrics are noisy, so they get a lot more slack.
+DEFAULT_TOLERANCES = {
+    'cost': 0.0,
+    'expanded': 0.0,
+    'peakFrontier': 0.05,
+    'heuristicCalls': 0.05,
+    'heuristicTime': 0.5,
+    'wallTime': 0.5,
+}
+
+class TimedHeuristic(object):
+    """
+    Wraps a heuristic and keeps count of how often it is called and how long it takes.
+    """
+
+    def __init__(self, heuristicFunction):
+        self.heuristicFunction = heuristicFunction
+        self.calls = 0
+        self.time = 0.0
+
+    def __call__(self, state, problem):
+        self.calls += 1
+
+        startTime = time.perf_counter()
+        value = self.heuristicFunction(state, problem)
+        self.time += time.perf_counter() - startTime
+
+        return value
+
+def timeSuccessors(problem):
+    """
+    Replace `problem.successorStates` with a version that measures its own run time.
+    Returns a one element list that accumulates the total time.
+    """
+
+    successorStates = problem.successorStates
+    totalTime = [0.0]
+
+    def timedSuccessorStates(state):
+        startTime = time.perf_counter()
+        successors = successorStates(state)
+        totalTime[0] += time.perf_counter() - startTime
+
+        return successors
+
+    problem.successorStates = timedSuccessorStates
+    return totalTime
+
+def runKey(run):
+    return '%s/%s/%s/%s' % (run['problem'], run['layout'], run['algorithm'], run['heuristic'])
+
+def buildProblem(problemName, layoutName, start = None):
+    """
+    Build a problem on a layout, optionally with Pacman starting at `start` instead,
+    or return None if the layout could not be loaded.
+    """
+
+    layout = getLayout(layoutName)
+    if layout is None:
+        logging.warning('Could not find layout: %s.' % (layoutName))
+        return None
+
+    if start is not None:
+        start = (int(start[0]), int(start[1]))
+        layout.agentPositions = [(isPacman, start if isPacman else position)
+                for isPacman, position in layout.agentPositions]
+
+    return PROBLEMS[problemName](PacmanGameState(layout))
+
+def runOne(problemName, layoutName, algorithmName, heuristicName, start = None,
+        keepActions = False):
+    """
+    Solve one problem and return a dict of its metrics (and its plan, if `keepActions` is set),
+    or None if the layout could not be loaded.
+    """
+
+    problem = buildProblem(problemName, layoutName, start)
+    if problem is None:
+        return None
+
+    successorTime = timeSuccessors(problem)
+
+    function = ALGORITHMS[algorithmName]
+    timedHeuristic = None
+
+    startTime = time.perf_counter()
+    if heuristicName is None:
+        actions = function(problem)
+    else:
+        timedHeuristic = TimedHeuristic(HEURISTICS[heuristicName])
+        actions = function(problem, timedHeuristic)
+    wallTime = time.perf_counter() - startTime
+
+    stats = getattr(problem, 'searchStats', None)
+
+    run = {
+        'problem': problemName,
+        'layout': layoutName,
+        'algorithm': algorithmName,
+        'heuristic': heuristicName,
+        'cost': problem.actionsCost(actions),
+        'length': len(actions),
+        'expanded': stats.expanded if stats is not None else None,
+        'peakFrontier': stats.peakFrontier if stats is not None else None,
+        'heuristicCalls': timedHeuristic.calls if timedHeuristic is not None else 0,
+        'heuristicTime': timedHeuristic.time if timedHeuristic is not None else 0.0,
+        'successorTime': successorTime[0],
+        'wallTime': wallTime,
+    }
+
+    if keepActions:
+        run['actions'] = actions
+
+    return run
+
+def runMatrix(matrix, algorithms = None, heuristics = None, layouts = None):
+    """
+    Run every entry of a benchmark matrix, optionally restricted to
+    some algorithms, heuristics (use 'none' for uninformed searches), or layouts.
+    """
+
+    results = []
+
+    for problemName, layoutNames, configurations in matrix:
+        for layoutName in layoutNames:
+            if layouts is not None and layoutName not in layouts:
+                continue
+
+            for algorithmName, heuristicName in configurations:
+                if algorithms is not None and algorithmName not in algorithms:
+                    continue
+
+                if heuristics is not None and (heuristicName or 'none') not in heuristics:
+                    continue
+
+                run = runOne(problemName, layoutName, algorithmName, heuristicName)
+                if run is None:
+                    continue
+
+                logging.info('%s: cost %s, expanded %s, %.3fs.'
+                        % (runKey(run), run['cost'], run['expanded'], run['wallTime']))
+                results.append(run)
+
+    return results
+
+def compare(results, baseline, tolerances = DEFAULT_TOLERANCES):
+    """
+    Compare results against baseline results.
+    Returns a list of human readable regression messages (empty if there are none).
+    """
+
+    baselineRuns = {runKey(run): run for run in baseline}
+    regressions = []
+
+    for run in results:
+        key = runKey(run)
+        if key not in baselineRuns:
+            continue
+
+        oldRun = baselineRuns[key]
+        for metric, tolerance in tolerances.items():
+            old = oldRun.get(metric)
+            new = run.get(metric)
+            if old is None or new is None:
+                continue
+
+            if new > old * (1.0 + tolerance) and new - old > 1e-3:
+                regressions.append('%s: %s went from %s to %s.' % (key, metric, old, new))
+
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description = 'Benchmark the search algorithms and heuristics.')
+    parser.add_argument('--output', default = 'searchBenchmark.json',
+            help = 'Where to write the results (default: %(default)s).')
+    parser.add_argument('--baseline', default = None,
+            help = 'A previous results file to compare against.')
+    parser.add_argument('--algorithms', nargs = '+', choices = sorted(ALGORITHMS), default = None,
+            help = 'Only run these algorithms.')
+    parser.add_argument('--heuristics', nargs = '+', choices = sorted(HEURISTICS) + ['none'],
+            default = None, help = 'Only run these heuristics.')
+    parser.add_argument('--layouts', nargs = '+', default = None,
+            help = 'Only run these layouts.')
+    options = parser.parse_args(argv)
+
+    logging.basicConfig(level = logging.INFO, format = '%(message)s')
+
+    results = runMatrix(DEFAULT_MATRIX, options.algorithms, options.heuristics, options.layouts)
+
+    with open(options.output, 'w') as file:
+        json.dump({'results': results}, file, indent = 4)
+
+    if options.baseline is None:
+        return 0
+
+    with open(options.baseline, 'r') as file:
+        baseline = json.load(file)['results']
+
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        logging.error(regression)
+
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
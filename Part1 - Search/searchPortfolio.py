@@ -0,0 +1,168 @@
+"""
+Run a portfolio of search strategies on one problem in parallel.
+
+Different layouts favor different algorithm and heuristic pairs,
+so instead of picking one up front every strategy of the portfolio is started in its own process.
+As soon as a strategy that guarantees an optimal plan finishes, its plan is used
+and the other processes are stopped.
+If the deadline comes first, the cheapest plan found so far is used.
+
+`portfolioSearch` has the same shape as the other search functions,
+so it can be given to `pacai.agents.search.base.SearchAgent`:
+```
+python -m pacai.bin.pacman -l trickySearch -p SearchAgent \\
+    -a fn=pacai.student.searchPortfolio.portfolioSearch,prob=pacai.core.search.food.FoodSearchProblem,heuristic=pacai.student.searchAgents.foodHeuristic
+```
+
+The problem and heuristic are handed to the worker processes as process arguments,
+so with the "spawn" start method (the default outside of Linux) they must be picklable.
+"""
+
+import logging
+import multiprocessing
+import queue
+import time
+
+from pacai.core.search import heuristic as heuristics
+from pacai.student import search
+
+# name: (search function, whether it takes a heuristic, whether its plans are optimal).
+# BFS is only optimal for unit step costs, which is what the food and corners problems have.
+STRATEGIES = {
+    'bfs': (search.breadthFirstSearch, False, True),
+    'ucs': (search.uniformCostSearch, False, True),
+    'astar': (search.aStarSearch, True, True),
+    'anytime': (search.anytimeAStarSolutions, True, False),
+    'greedy': (search.greedySearch, True, False),
+}
+
+DEFAULT_STRATEGIES = ('bfs', 'astar', 'anytime', 'greedy')
+
+def _runStrategy(name, problem, heuristic, timeLimit, results):
+    """
+    The body of a worker process: solve the problem with one strategy and put the result on a queue.
+    """
+
+    function, usesHeuristic, optimal = STRATEGIES[name]
+    startTime = time.perf_counter()
+
+    try:
+        if name == 'anytime':
+            # Report every improvement, so the parent always has the best plan so far.
+            result = _result(name, problem, [], False, startTime, False)
+            for actions, bound in function(problem, heuristic, timeLimit = timeLimit):
+                result = _result(name, problem, actions, bound <= 1.0, startTime, False)
+                results.put(result)
+
+            result['final'] = True
+            results.put(result)
+            return
+
+        if usesHeuristic:
+            actions = function(problem, heuristic)
+        else:
+            actions = function(problem)
+
+        results.put(_result(name, problem, actions, optimal, startTime, True))
+    except Exception as ex:
+        results.put({'strategy': name, 'error': repr(ex), 'final': True,
+                'wallTime': time.perf_counter() - startTime})
+
+def _result(name, problem, actions, optimal, startTime, final):
+    stats = getattr(problem, 'searchStats', None)
+
+    return {
+        'strategy': name,
+        'actions': actions,
+        'cost': problem.actionsCost(actions) if actions else float('inf'),
+        'optimal': optimal and bool(actions),
+        'final': final,
+        'expanded': stats.expanded if stats is not None else problem._numExpanded,
+        'peakFrontier': stats.peakFrontier if stats is not None else None,
+        'wallTime': time.perf_counter() - startTime,
+    }
+
+def portfolioSearch(problem, heuristic = heuristics.null,
+        strategies = DEFAULT_STRATEGIES, timeLimit = 30.0):
+    """
+    Solve a problem with several strategies (names from `STRATEGIES`) in parallel processes.
+
+    Returns the plan of the first strategy that finishes with an optimal plan.
+    If none does within `timeLimit` seconds, the cheapest plan found by then is returned
+    (an empty list if there is none).
+    Per-strategy results are logged and kept in `problem.portfolioResults`.
+    """
+
+    if isinstance(strategies, str):
+        strategies = strategies.split(':')
+
+    for name in strategies:
+        if name not in STRATEGIES:
+            raise ValueError('Unknown search strategy: "%s".' % (name))
+
+    timeLimit = float(timeLimit)
+    deadline = time.perf_counter() + timeLimit
+    results = multiprocessing.Queue()
+
+    workers = {}
+    for name in strategies:
+        worker = multiprocessing.Process(target = _runStrategy,
+                args = (name, problem, heuristic, timeLimit, results), daemon = True)
+        worker.start()
+        workers[name] = worker
+
+    best = {}
+    running = set(strategies)
+    winner = None
+
+    while running and winner is None:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+
+        try:
+            result = results.get(timeout = remaining)
+        except queue.Empty:
+            break
+
+        name = result['strategy']
+        if result['final']:
+            running.discard(name)
+
+        if 'error' in result:
+            logging.warning('Search strategy %s failed: %s.' % (name, result['error']))
+            continue
+
+        if name not in best or result['cost'] <= best[name]['cost']:
+            best[name] = result
+
+        if result['optimal']:
+            winner = result
+
+    for name, worker in workers.items():
+        if worker.is_alive():
+            worker.terminate()
+
+        worker.join()
+
+    if winner is None and len(best) > 0:
+        winner = min(best.values(), key = lambda result: result['cost'])
+
+    for name in strategies:
+        if name in best:
+            result = best[name]
+            logging.info('Portfolio %s: cost %s, optimal %s, expanded %s, %.3fs%s.'
+                    % (name, result['cost'], result['optimal'], result['expanded'],
+                        result['wallTime'], ' (used)' if result is winner else ''))
+        else:
+            logging.info('Portfolio %s: no plan%s.'
+                    % (name, ' (stopped)' if name in running else ''))
+
+    problem.portfolioResults = list(best.values())
+
+    if winner is None:
+        logging.warning('No search strategy found a plan within %.1fs.' % (timeLimit))
+        return []
+
+    problem._numExpanded += winner['expanded'] or 0
+    return winner['actions']
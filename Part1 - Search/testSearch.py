@@ -0,0 +1,724 @@
+"""
+Equivalence tests for the search algorithms in `pacai.student.search` and the modules around it:
+every search is checked against the plain search it is meant to match.
+
+Run with `python -m unittest pacai.student.testSearch`.
+"""
+
+import collections
+import json
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.actions import Actions
+from pacai.core.distance import manhattan
+from pacai.core.layout import getLayout
+from pacai.core.search import heuristic
+from pacai.core.search.food import FoodSearchProblem
+from pacai.core.search.position import PositionSearchProblem
+from pacai.core.search.problem import SearchProblem
+from pacai.util.priorityQueue import PriorityQueue
+
+from pacai.student import corridorGraph
+from pacai.student import distanceField
+from pacai.student import distanceTable
+from pacai.student import jumpPoints
+from pacai.student import planCache
+from pacai.student import search
+from pacai.student import searchAgents
+from pacai.student import searchBatch
+from pacai.student import searchBenchmark
+from pacai.student import searchPortfolio
+from pacai.student.search import BucketQueue
+
+def makeState(layoutName):
+    return PacmanGameState(getLayout(layoutName))
+
+def positionProblem(state, start, goal):
+    return PositionSearchProblem(state, goal = goal, start = start)
+
+def positionPairs(state, count, seed = 0):
+    """ Some (start, goal) pairs of open cells, the same ones on every run. """
+    cells = distanceTable.openCells(state.getWalls())
+    rng = random.Random(seed)
+    return [tuple(rng.sample(cells, 2)) for _ in range(count)]
+
+def endPosition(start, actions):
+    x, y = start
+    for action in actions:
+        x, y = Actions.getSuccessor((x, y), action)
+
+    return (int(x), int(y))
+
+def playFood(problem, actions):
+    """ The state of a `CompactFoodSearchProblem` after some actions. """
+    state = problem.startingState()
+    for action in actions:
+        state = [successor for successor, successorAction, _ in problem.successorStates(state)
+                if successorAction == action][0]
+
+    return state
+
+class GraphProblem(SearchProblem):
+    """
+    A search problem on an explicit graph: {state: [(successor, cost), ...]}.
+    Counts how often each state is expanded.
+    """
+
+    def __init__(self, edges, start, goal):
+        super().__init__()
+
+        self.edges = edges
+        self.start = start
+        self.goal = goal
+        self.expansions = collections.Counter()
+
+    def startingState(self):
+        return self.start
+
+    def isGoal(self, state):
+        return state == self.goal
+
+    def successorStates(self, state):
+        self.expansions[state] += 1
+        return [(successor, successor, cost) for successor, cost in self.edges.get(state, [])]
+
+    def actionsCost(self, actions):
+        cost = 0
+        state = self.start
+        for action in actions:
+            cost += dict(self.edges[state])[action]
+            state = action
+
+        return cost
+
+class PositionSearchTestCase(unittest.TestCase):
+    """
+    Checks that a search finds shortest paths between open cells of some mazes
+    (and no path between cells that are walled off from each other).
+    """
+
+    LAYOUTS = ('tinyMaze', 'mediumMaze', 'openMaze')
+
+    def assertShortestPaths(self, searchFunction, pairs = 20, layouts = LAYOUTS):
+        for layoutName in layouts:
+            state = makeState(layoutName)
+            table = distanceTable.getDistanceTable(state.getWalls())
+
+            for start, goal in positionPairs(state, pairs):
+                problem = positionProblem(state, start, goal)
+                actions = searchFunction(problem)
+
+                message = '%s from %s to %s' % (layoutName, start, goal)
+                if table.getDistance(start, goal) == float('inf'):
+                    self.assertEqual([], actions, message)
+                    continue
+
+                self.assertEqual(goal, endPosition(start, actions), message)
+                self.assertEqual(table.getDistance(start, goal), problem.actionsCost(actions), message)
+
+class GraphSearchTest(PositionSearchTestCase):
+    def testNodePaths(self):
+        nodes = search.SearchNodes()
+        root = nodes.add('a')
+        child = nodes.add('b', root, 'East', 1)
+        grandchild = nodes.add('c', child, 'North', 2)
+        nodes.add('d', root, 'West', 1)
+
+        self.assertEqual([], nodes.path(root))
+        self.assertEqual(['East', 'North'], nodes.path(grandchild))
+
+    def testShortestPaths(self):
+        self.assertShortestPaths(search.breadthFirstSearch)
+        self.assertShortestPaths(search.uniformCostSearch)
+        self.assertShortestPaths(lambda problem: search.aStarSearch(problem, heuristic.manhattan))
+
+    def testDepthFirstPlansReachTheGoal(self):
+        for layoutName in self.LAYOUTS:
+            state = makeState(layoutName)
+            table = distanceTable.getDistanceTable(state.getWalls())
+
+            for start, goal in positionPairs(state, 10):
+                problem = positionProblem(state, start, goal)
+                actions = search.depthFirstSearch(problem)
+                if table.getDistance(start, goal) == float('inf'):
+                    self.assertEqual([], actions)
+                    continue
+
+                self.assertEqual(goal, endPosition(start, actions))
+                self.assertLess(problem.actionsCost(actions), 999999)
+
+class CostTrackingTest(unittest.TestCase):
+    def testMatchesPlainUniformCostSearch(self):
+        for layoutName in PositionSearchTestCase.LAYOUTS:
+            state = makeState(layoutName)
+            for start, goal in positionPairs(state, 10):
+                def makeProblem():
+                    return PositionSearchProblem(state, costFn = lambda position: 1 + position[0] % 3,
+                            goal = goal, start = start)
+
+                # Uniform cost search without any cost tracking, on a plain priority queue.
+                problem = makeProblem()
+                expected = problem.actionsCost(
+                        search.graphSearch(problem, PriorityQueue(), lambda state, cost: cost))
+                plainExpanded = problem.searchStats.expanded
+
+                for searchFunction in (search.uniformCostSearch,
+                        lambda problem: search.aStarSearch(problem, heuristic.manhattan)):
+                    problem = makeProblem()
+                    actions = searchFunction(problem)
+
+                    self.assertEqual(expected, problem.actionsCost(actions))
+                    self.assertLessEqual(problem.searchStats.expanded, plainExpanded)
+
+class BucketQueueTest(unittest.TestCase):
+    def testPopsInPriorityOrder(self):
+        queue = BucketQueue()
+        for item, priority in (('c', 3), ('a', 1), ('b', 1), ('d', 0)):
+            queue.push(item, priority)
+
+        self.assertFalse(queue.isHeap())
+        self.assertEqual(['d', 'a', 'b', 'c'], [queue.pop() for _ in range(4)])
+        self.assertTrue(queue.isEmpty())
+
+    def testFallsBackToAHeap(self):
+        for odd in (2.5, -1, BucketQueue.MAX_BUCKETS, float('inf'), float('nan')):
+            queue = BucketQueue()
+            queue.push('a', 2)
+            queue.push('b', 1)
+            queue.push('c', odd)
+
+            self.assertTrue(queue.isHeap())
+            self.assertEqual(3, len(queue))
+
+            items = [queue.pop() for _ in range(3)]
+            self.assertEqual(['a', 'b', 'c'], sorted(items))
+            if odd == float('inf'):
+                self.assertEqual(['b', 'a', 'c'], items)
+
+class AStarTest(unittest.TestCase):
+    def testInfiniteHeuristicForDeadCells(self):
+        state = makeState('mediumMaze')
+        table = distanceTable.getDistanceTable(state.getWalls())
+        start = state.getPacmanPosition()
+        goal = (1, 1)
+        optimal = table.getDistance(start, goal)
+
+        # Cells off every shortest path can be written off as dead ends.
+        dead = {cell for cell in distanceTable.openCells(state.getWalls())
+                if table.getDistance(start, cell) + table.getDistance(cell, goal) > optimal}
+        self.assertTrue(len(dead) > 0)
+
+        def deadEndHeuristic(position, problem):
+            return float('inf') if position in dead else manhattan(position, problem.goal)
+
+        problem = positionProblem(state, start, goal)
+        actions = search.aStarSearch(problem, deadEndHeuristic)
+        self.assertEqual(optimal, problem.actionsCost(actions))
+
+class BidirectionalSearchTest(PositionSearchTestCase):
+    def testBreadthFirst(self):
+        self.assertShortestPaths(search.bidirectionalSearch)
+
+    def testAStar(self):
+        self.assertShortestPaths(lambda problem: search.bidirectionalAStarSearch(problem, heuristic.manhattan))
+        self.assertShortestPaths(lambda problem: search.bidirectionalAStarSearch(problem, heuristic.null))
+
+class CorridorSearchTest(PositionSearchTestCase):
+    def testUnitCosts(self):
+        self.assertShortestPaths(corridorGraph.corridorSearch)
+
+    def testMatchesUniformCostSearch(self):
+        for layoutName in self.LAYOUTS:
+            state = makeState(layoutName)
+            for start, goal in positionPairs(state, 10):
+                problem = PositionSearchProblem(state, costFn = lambda position: 1 + position[0] % 3,
+                        goal = goal, start = start)
+                expected = search.uniformCostSearch(problem)
+                actions = corridorGraph.corridorSearch(problem)
+
+                # Start and goal always differ, so an empty plan means there is no path.
+                if expected == []:
+                    self.assertEqual([], actions)
+                    continue
+
+                self.assertEqual(goal, endPosition(start, actions))
+                self.assertEqual(problem.actionsCost(expected), problem.actionsCost(actions))
+
+class MemoryBoundedSearchTest(PositionSearchTestCase):
+    def testIterativeDeepeningAStar(self):
+        # IDA* keeps no closed list, so the many equal length paths across openMaze take it forever.
+        self.assertShortestPaths(
+                lambda problem: search.iterativeDeepeningAStarSearch(problem, heuristic.manhattan),
+                layouts = ('tinyMaze', 'mediumMaze'))
+
+    def testMemoryBoundedAStar(self):
+        self.assertShortestPaths(
+                lambda problem: search.memoryBoundedAStarSearch(problem, heuristic.manhattan))
+
+    def testMemoryBoundedAStarStaysWithinItsBound(self):
+        maxNodes = 200
+
+        def boundedSearch(problem):
+            actions = search.memoryBoundedAStarSearch(problem, heuristic.manhattan, maxNodes)
+            # Memory can only go over by the successors of one node.
+            self.assertLessEqual(problem.searchStats.peakFrontier, maxNodes + 4)
+            return actions
+
+        self.assertShortestPaths(boundedSearch)
+
+    def testFoodSearch(self):
+        state = makeState('trickySearch')
+        problem = searchAgents.CompactFoodSearchProblem(state)
+        optimal = problem.actionsCost(search.aStarSearch(problem, searchAgents.foodMSTHeuristic))
+
+        for actions in (search.iterativeDeepeningAStarSearch(problem, searchAgents.foodMSTHeuristic),
+                search.memoryBoundedAStarSearch(problem, searchAgents.foodMSTHeuristic, 100)):
+            self.assertEqual(optimal, problem.actionsCost(actions))
+            self.assertTrue(problem.isGoal(playFood(problem, actions)))
+
+class AnytimeSearchTest(PositionSearchTestCase):
+    def testFinalPlanIsOptimal(self):
+        self.assertShortestPaths(
+                lambda problem: search.anytimeAStarSearch(problem, heuristic.manhattan, timeLimit = 10.0))
+
+    def testPlansImproveWithinTheirBounds(self):
+        state = makeState('trickySearch')
+        problem = searchAgents.CompactFoodSearchProblem(state)
+        optimal = problem.actionsCost(search.aStarSearch(problem, searchAgents.foodMSTHeuristic))
+
+        solutions = list(search.anytimeAStarSolutions(problem, searchAgents.foodMSTHeuristic,
+                weight = 5.0, weightStep = 1.0))
+        self.assertTrue(len(solutions) > 0)
+
+        costs = [problem.actionsCost(actions) for actions, _ in solutions]
+        bounds = [bound for _, bound in solutions]
+
+        self.assertEqual(sorted(costs, reverse = True), costs)
+        self.assertEqual(sorted(bounds, reverse = True), bounds)
+        for (actions, bound), cost in zip(solutions, costs):
+            self.assertTrue(problem.isGoal(playFood(problem, actions)))
+            self.assertLessEqual(cost, bound * optimal)
+
+        self.assertEqual(1, bounds[-1])
+        self.assertEqual(optimal, costs[-1])
+
+    def testClosedStatesAreNotReopened(self):
+        # With the weight at 3, S is first reached through B (at cost 6), then through C (at cost 2).
+        # The first pass ends with S expanded and its older, stale entry still on the frontier.
+        edges = {
+            'A': [('B', 1), ('C', 1)],
+            'B': [('S', 5)],
+            'C': [('S', 1)],
+            'S': [('G', 10)],
+        }
+        heuristicValues = {'A': 0, 'B': 0, 'C': 1, 'S': 3, 'G': 0}
+        problem = GraphProblem(edges, 'A', 'G')
+
+        solutions = list(search.anytimeAStarSolutions(problem,
+                lambda state, problem: heuristicValues[state], weight = 3.0, weightStep = 2.0))
+
+        self.assertEqual(['C', 'S', 'G'], solutions[-1][0])
+        self.assertEqual(1, solutions[-1][1])
+        self.assertEqual(1, problem.expansions['S'])
+
+    def testLaterPassesReuseEarlierOnes(self):
+        state = makeState('openMaze')
+        start, goal = positionPairs(state, 1, seed = 1)[0]
+
+        solutions = []
+        expanded = []
+        problem = positionProblem(state, start, goal)
+        for actions, bound in search.anytimeAStarSolutions(problem, heuristic.euclidean,
+                weight = 3.0, weightStep = 0.5):
+            solutions.append(actions)
+            expanded.append(problem.searchStats.expanded)
+
+        fresh = positionProblem(state, start, goal)
+        search.aStarSearch(fresh, heuristic.euclidean)
+
+        # Each pass only expands the states that were left open or were improved.
+        passes = [later - earlier for earlier, later in zip([0] + expanded, expanded)]
+        self.assertGreater(len(passes), 1)
+        self.assertLess(passes[-1], fresh.searchStats.expanded)
+
+class JumpPointSearchTest(PositionSearchTestCase):
+    def testShortestPaths(self):
+        self.assertShortestPaths(jumpPoints.jumpPointSearch, pairs = 40)
+
+    def testExpandsFewerNodesInOpenAreas(self):
+        state = makeState('openMaze')
+        problem = positionProblem(state, state.getPacmanPosition(), (1, 1))
+        search.breadthFirstSearch(problem)
+        expanded = problem.searchStats.expanded
+
+        problem = positionProblem(state, state.getPacmanPosition(), (1, 1))
+        jumpPoints.jumpPointSearch(problem)
+        self.assertLess(problem.searchStats.expanded, expanded)
+
+class FoodHeuristicCacheTest(unittest.TestCase):
+    def testLRUCacheEvictsLeastRecentlyUsed(self):
+        cache = searchAgents.LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual([1, 3], [cache.get('a'), cache.get('c')])
+        self.assertEqual((3, 0), (cache.hits, cache.misses))
+
+    def testCachedValuesMatchFreshValues(self):
+        state = makeState('trickySearch')
+        problem = FoodSearchProblem(state)
+
+        seen = []
+        def recordingHeuristic(searchState, searchProblem):
+            seen.append(searchState)
+            return searchAgents.foodHeuristic(searchState, searchProblem)
+
+        optimal = problem.actionsCost(search.aStarSearch(problem, recordingHeuristic))
+        cache = problem.heuristicInfo['foodHeuristicCache']
+        self.assertGreater(cache.hits, 0)
+
+        for searchState in seen[::50]:
+            self.assertEqual(searchAgents.foodHeuristic(searchState, problem),
+                    searchAgents.foodHeuristic(searchState, FoodSearchProblem(state)))
+
+        # A cache that keeps evicting does not change the plan.
+        with mock.patch.object(searchAgents, 'FOOD_HEURISTIC_CACHE_SIZE', 4):
+            problem = FoodSearchProblem(state)
+            actions = search.aStarSearch(problem, searchAgents.foodHeuristic)
+            self.assertEqual(optimal, problem.actionsCost(actions))
+
+class FoodMSTHeuristicTest(unittest.TestCase):
+    def testConsistentAndIncremental(self):
+        state = makeState('trickySearch')
+        problem = searchAgents.CompactFoodSearchProblem(state)
+
+        seen = []
+        def recordingHeuristic(searchState, searchProblem):
+            seen.append(searchState)
+            return searchAgents.foodMSTHeuristic(searchState, searchProblem)
+
+        actions = search.aStarSearch(problem, recordingHeuristic)
+        expected = search.aStarSearch(searchAgents.CompactFoodSearchProblem(state),
+                searchAgents.compactFoodHeuristic)
+        self.assertEqual(problem.actionsCost(expected), problem.actionsCost(actions))
+
+        for searchState in seen[::10]:
+            value = searchAgents.foodMSTHeuristic(searchState, problem)
+
+            # Trees derived from a parent's tree match trees built from scratch.
+            fresh = searchAgents.CompactFoodSearchProblem(state)
+            self.assertEqual(searchAgents.foodMSTHeuristic(searchState, fresh), value)
+
+            for successor, _, cost in problem.successorStates(searchState):
+                self.assertLessEqual(value, cost + searchAgents.foodMSTHeuristic(successor, problem))
+
+    def testFoodSearchProblem(self):
+        state = makeState('trickySearch')
+        problem = FoodSearchProblem(state)
+        actions = search.aStarSearch(problem, searchAgents.foodMSTHeuristic)
+
+        compact = searchAgents.CompactFoodSearchProblem(state)
+        expected = search.aStarSearch(compact, searchAgents.compactFoodHeuristic)
+        self.assertEqual(compact.actionsCost(expected), problem.actionsCost(actions))
+
+class CompactProblemsTest(unittest.TestCase):
+    def testCornersProblem(self):
+        for layoutName in ('tinyCorners', 'mediumCorners'):
+            state = makeState(layoutName)
+            problem = searchAgents.CornersProblem(state)
+            optimal = problem.actionsCost(search.uniformCostSearch(problem))
+
+            compact = searchAgents.CompactCornersProblem(state)
+            for actions in (search.uniformCostSearch(compact),
+                    search.aStarSearch(compact, searchAgents.compactCornersHeuristic)):
+                self.assertEqual(optimal, problem.actionsCost(actions))
+                self.assertEqual(optimal, compact.actionsCost(actions))
+
+    def testFoodSearchProblem(self):
+        for layoutName in ('testSearch', 'trickySearch'):
+            state = makeState(layoutName)
+            problem = FoodSearchProblem(state)
+            optimal = problem.actionsCost(search.aStarSearch(problem, searchAgents.foodHeuristic))
+
+            compact = searchAgents.CompactFoodSearchProblem(state)
+            actions = search.aStarSearch(compact, searchAgents.compactFoodHeuristic)
+            self.assertEqual(optimal, problem.actionsCost(actions))
+            self.assertEqual(optimal, compact.actionsCost(actions))
+
+class SearchBenchmarkTest(unittest.TestCase):
+    def testEveryAlgorithmRuns(self):
+        # DFS and greedy search make no promise of a shortest plan.
+        unbounded = {'dfs', 'greedy'}
+        informed = {'astar', 'greedy', 'bidirectionalAstar', 'idastar', 'smastar', 'anytime'}
+
+        optimal = searchBenchmark.runOne('position', 'mediumMaze', 'bfs', None)['cost']
+        for algorithmName in searchBenchmark.ALGORITHMS:
+            heuristicName = 'manhattan' if algorithmName in informed else None
+            run = searchBenchmark.runOne('position', 'mediumMaze', algorithmName, heuristicName)
+
+            if algorithmName in unbounded:
+                self.assertTrue(optimal <= run['cost'] < 999999)
+            else:
+                self.assertEqual(optimal, run['cost'], algorithmName)
+
+class NearestFoodFieldTest(unittest.TestCase):
+    def testRepairsMatchFreshFields(self):
+        state = makeState('smallClassic')
+        walls = state.getWalls()
+        food = state.getFood().asList()
+
+        field = searchAgents.NearestFoodField(walls, food)
+        random.Random(0).shuffle(food)
+        while food:
+            field.removeFood(food.pop())
+            fresh = searchAgents.NearestFoodField(walls, food)
+            self.assertEqual(fresh.distances, field.distances)
+
+        self.assertFalse(field.hasFood())
+
+    def testClosestDotAgentAlwaysGoesToTheClosestFood(self):
+        for lazy in (False, True):
+            state = makeState('smallClassic')
+            table = distanceTable.getDistanceTable(state.getWalls())
+
+            agent = searchAgents.ClosestDotSearchAgent(0, lazy = lazy)
+            agent.registerInitialState(state)
+
+            food = set(state.getFood().asList())
+            lastEaten = state.getPacmanPosition()
+            steps = 0
+            while food:
+                action = agent.getAction(state)
+                state = state.generatePacmanSuccessor(action)
+                position = state.getPacmanPosition()
+                steps += 1
+
+                if position in food:
+                    self.assertEqual(table.getMinDistance(lastEaten, list(food)), steps)
+                    food.remove(position)
+                    lastEaten = position
+                    steps = 0
+
+class SearchBatchTest(unittest.TestCase):
+    JOBS = [
+        {'id': 'maze', 'layout': 'mediumMaze', 'problem': 'position', 'algorithm': 'bfs'},
+        {'layout': 'tinyCorners', 'problem': 'corners', 'algorithm': 'astar', 'heuristic': 'corners'},
+        {'layout': 'testSearch', 'problem': 'food', 'start': [1, 1], 'algorithm': 'ucs'},
+        {'id': 'missing', 'layout': 'noSuchLayout', 'problem': 'position', 'algorithm': 'bfs'},
+    ]
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.manifestPath = os.path.join(self._directory.name, 'jobs.jsonl')
+        self.outputPath = os.path.join(self._directory.name, 'results.jsonl')
+
+        with open(self.manifestPath, 'w') as file:
+            for job in self.JOBS:
+                file.write(json.dumps(job) + '\n')
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def readResults(self):
+        with open(self.outputPath, 'r') as file:
+            return {result['id']: result for result in map(json.loads, file)}
+
+    def testMatchesSerialRuns(self):
+        jobs = searchBatch.readManifest(self.manifestPath)
+        self.assertEqual(1, searchBatch.runBatch(jobs, self.outputPath, processes = 2))
+
+        results = self.readResults()
+        self.assertEqual(len(jobs), len(results))
+        self.assertIn('error', results['missing'])
+
+        for job in jobs[:-1]:
+            run = searchBenchmark.runOne(job['problem'], job['layout'], job['algorithm'],
+                    job.get('heuristic'), job.get('start'), keepActions = True)
+            result = results[searchBatch.jobId(job)]
+            self.assertEqual(run['cost'], result['cost'])
+            self.assertEqual(run['actions'], result['actions'])
+
+        # A second run only retries the job that failed.
+        self.assertEqual(1, searchBatch.runBatch(jobs, self.outputPath, processes = 2))
+        with open(self.outputPath, 'r') as file:
+            self.assertEqual(len(jobs), len(file.readlines()))
+
+    def testRejectsUnknownNames(self):
+        with open(self.manifestPath, 'a') as file:
+            file.write(json.dumps({'layout': 'tinyMaze', 'problem': 'position', 'algorithm': 'magic'}))
+
+        with self.assertRaises(ValueError):
+            searchBatch.readManifest(self.manifestPath)
+
+class PortfolioSearchTest(unittest.TestCase):
+    def testReturnsAnOptimalPlan(self):
+        state = makeState('trickySearch')
+        compact = searchAgents.CompactFoodSearchProblem(state)
+        optimal = compact.actionsCost(search.aStarSearch(compact, searchAgents.compactFoodHeuristic))
+
+        problem = FoodSearchProblem(state)
+        actions = searchPortfolio.portfolioSearch(problem, searchAgents.foodHeuristic)
+        self.assertEqual(optimal, problem.actionsCost(actions))
+        self.assertTrue(any(result['optimal'] for result in problem.portfolioResults))
+
+    def testFallsBackToTheCheapestPlan(self):
+        state = makeState('mediumMaze')
+        problem = positionProblem(state, state.getPacmanPosition(), (1, 1))
+        actions = searchPortfolio.portfolioSearch(problem, heuristic.manhattan, strategies = 'greedy')
+
+        self.assertEqual((1, 1), endPosition(state.getPacmanPosition(), actions))
+        self.assertLess(problem.actionsCost(actions), 999999)
+
+class PlanCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, 'plans.sqlite')
+
+    def tearDown(self):
+        cache = planCache._openCaches.pop(self.path, None)
+        if cache is not None:
+            cache.close()
+
+        self._directory.cleanup()
+
+    def testReopenedCacheTakesNewMaxEntries(self):
+        cache = planCache.getPlanCache(self.path, 5)
+        self.assertIs(cache, planCache.getPlanCache(self.path, 2))
+        self.assertEqual(2, cache.maxEntries)
+
+        for index in range(3):
+            cache.put('plan%d' % index, 'walls', ['North'])
+
+        self.assertEqual(2, len(cache))
+
+        self.assertIs(cache, planCache.getPlanCache(self.path))
+        self.assertEqual(2, cache.maxEntries)
+
+    def testClosestDotAgentKeepsTheCacheLimit(self):
+        cache = planCache.getPlanCache(self.path, 3)
+        agent = searchAgents.ClosestDotSearchAgent(0, cachePlans = 'true', cachePath = self.path)
+        agent.registerInitialState(makeState('trickySearch'))
+
+        self.assertIs(cache, agent._cache)
+        self.assertEqual(3, cache.maxEntries)
+        self.assertEqual(1, len(cache))
+
+    def testPlansThatHitWallsAreDropped(self):
+        state = makeState('tinyMaze')
+        agent = searchAgents.CachedSearchAgent(0, cachePath = self.path,
+                fn = 'pacai.student.search.breadthFirstSearch')
+        walls, key = planCache.planKey(state, agent._planName)
+        agent._cache.put(key, walls, ['North', 'North', 'North'])
+        agent._cache.put('other', walls, ['West'])
+
+        agent.registerInitialState(state)
+
+        self.assertTrue(planCache.planFits(state, agent._actions))
+        self.assertEqual(endPosition(state.getPacmanPosition(), agent._actions), (1, 1))
+        self.assertIsNone(agent._cache.get('other'))
+        self.assertEqual(agent._actions, agent._cache.get(key))
+
+    def testPlanNameIncludesDefaults(self):
+        default = searchAgents.CachedSearchAgent(0, cachePath = self.path)
+        explicit = searchAgents.CachedSearchAgent(0, cachePath = self.path,
+                fn = 'pacai.core.search.search.depthFirstSearch')
+        other = searchAgents.CachedSearchAgent(0, cachePath = self.path,
+                fn = 'pacai.student.search.breadthFirstSearch')
+
+        self.assertIn('depthFirstSearch', default._planName)
+        self.assertEqual(default._planName, explicit._planName)
+        self.assertNotEqual(default._planName, other._planName)
+
+class DistanceTableTest(unittest.TestCase):
+    def setUp(self):
+        self.walls = makeState('tinyMaze').getWalls()
+        distanceTable._loadedTables.pop(distanceTable.wallsHash(self.walls), None)
+
+    def tearDown(self):
+        distanceTable._loadedTables.pop(distanceTable.wallsHash(self.walls), None)
+
+    def testMatchesBreadthFirstSearch(self):
+        state = makeState('tinyMaze')
+        table = distanceTable.getDistanceTable(self.walls)
+
+        cells = distanceTable.openCells(self.walls)
+        for start in cells[::3]:
+            for goal in cells[::4]:
+                actions = search.breadthFirstSearch(positionProblem(state, start, goal))
+                self.assertEqual(len(actions), table.getDistance(start, goal))
+
+    def testSavesOnlyWhenAsked(self):
+        with mock.patch.dict(os.environ), mock.patch.object(distanceTable, '_saveDistances') as save:
+            os.environ.pop(distanceTable.CACHE_DIR_ENV, None)
+            table = distanceTable.getDistanceTable(self.walls)
+            save.assert_not_called()
+            self.assertNotIsInstance(table.distances, numpy.memmap)
+
+        with tempfile.TemporaryDirectory() as cacheDir:
+            distanceTable._loadedTables.clear()
+            saved = distanceTable.getDistanceTable(self.walls, cacheDir)
+            path = os.path.join(cacheDir, distanceTable.wallsHash(self.walls) + '.npy')
+            self.assertTrue(os.path.isfile(path))
+
+            distanceTable._loadedTables.clear()
+            loaded = distanceTable.getDistanceTable(self.walls, cacheDir)
+            self.assertIsNot(saved, loaded)
+            self.assertTrue((saved.distances == loaded.distances).all())
+
+class DistanceFieldTest(unittest.TestCase):
+    def testMatchesBreadthFirstSearch(self):
+        state = makeState('mediumMaze')
+        walls = state.getWalls()
+        cells = distanceTable.openCells(walls)
+
+        for source in cells[::40]:
+            field = distanceField.distanceField(walls, [source])
+            for goal in cells[::7]:
+                actions = search.breadthFirstSearch(positionProblem(state, source, goal))
+                expected = len(actions) if (actions or source == goal) else float('inf')
+                self.assertEqual(expected, distanceField.distanceAt(field, goal))
+
+    def testMultipleSources(self):
+        walls = makeState('mediumMaze').getWalls()
+        cells = distanceTable.openCells(walls)
+        sources = random.Random(0).sample(cells, 5)
+
+        combined = distanceField.distanceField(walls, sources)
+        single = [distanceField.distanceField(walls, [source]) for source in sources]
+        self.assertTrue((combined == numpy.minimum.reduce(single)).all())
+
+        mask = numpy.zeros(combined.shape, dtype = bool)
+        for x, y in sources:
+            mask[x, y] = True
+
+        self.assertTrue((distanceField.distanceField(walls, mask) == combined).all())
+
+        limited = distanceField.distanceField(walls, sources, maxDistance = 3)
+        reached = combined <= 3
+        self.assertTrue((limited[reached] == combined[reached]).all())
+        self.assertTrue((limited[~reached] == distanceField.UNREACHABLE).all())
+
+    def testClosestDotMatchesBreadthFirstSearch(self):
+        for layoutName in ('mediumMaze', 'trickySearch', 'smallClassic'):
+            state = makeState(layoutName)
+            for start in distanceTable.openCells(state.getWalls())[::11]:
+                problem = searchAgents.AnyFoodSearchProblem(state, start = start)
+                expected = search.breadthFirstSearch(problem)
+
+                problem = searchAgents.AnyFoodSearchProblem(state, start = start)
+                actions = search.aStarSearch(problem, searchAgents.anyFoodHeuristic)
+                self.assertEqual(len(expected), len(actions))
+                self.assertEqual(len(actions), problem.getCostOfActions(actions))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Evaluation functions on maze distances, with cheap repeated evaluation.
+
+`betterEvaluationFunction` and `ReflexAgent.evaluationFunction` (in `pacai.student.multiagents`)
+measure straight line distances to every food and ghost, at every leaf of a search.
+A `MazeEvaluator` uses the true maze distances of a `pacai.student.distanceTable.DistanceTable` instead,
+and avoids most of the work:
+- A ghost distance is one lookup in the table.
+- The distance to the closest food is one lookup in a `pacai.student.distanceField`
+  seeded from all of the remaining food, which is built once per food bitmask
+  (the mask a `pacai.student.searchState.SearchState` already keeps).
+  Pacman rarely eats during a search, so there are only a few of these fields.
+- Values are cached per state (by Zobrist key, when the state keeps one).
+
+`mazeBetterEvaluationFunction` can be used wherever an evaluation function is expected, e.g.:
+```
+--agent-args evalFn=pacai.student.mazeEvaluation.mazeBetterEvaluationFunction
+```
+"""
+
+import numpy
+
+from pacai.student.distanceField import distanceAt
+from pacai.student.distanceField import distanceField
+from pacai.student.distanceTable import UNREACHABLE
+from pacai.student.distanceTable import getDistanceTable
+from pacai.student.searchState import SearchState
+
+DEFAULT_CACHE_SIZE = 100000
+
+# Food fields are a whole grid each, so far fewer of them are kept.
+MAX_FOOD_FIELDS = 256
+
+# The evaluators of the most recently used wall grids, keyed by id (the grid is kept too,
+# so a reused id can be detected).
+_evaluators = {}
+MAX_CACHED_GRIDS = 16
+
+def getMazeEvaluator(walls):
+    """
+    Get the (shared within this process) evaluator for a wall grid.
+    """
+
+    cached = _evaluators.get(id(walls))
+    if cached is not None and cached[0] is walls:
+        return cached[1]
+
+    if len(_evaluators) >= MAX_CACHED_GRIDS:
+        _evaluators.clear()
+
+    evaluator = MazeEvaluator(walls)
+    _evaluators[id(walls)] = (walls, evaluator)
+    return evaluator
+
+class MazeEvaluator(object):
+    """
+    Maze distance features and evaluations for the states of one layout.
+    Every cache holds at most `maxEntries` entries (`MAX_FOOD_FIELDS` for food fields),
+    and drops the oldest ones first.
+    """
+
+    def __init__(self, walls, maxEntries = DEFAULT_CACHE_SIZE):
+        self.walls = walls
+        self.table = getDistanceTable(walls)
+        self.maxEntries = maxEntries
+        self._width = walls.getWidth()
+        self._height = walls.getHeight()
+
+        self._foodFields = {}
+        self._values = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, cache, key, value, maxEntries = None):
+        if len(cache) >= (maxEntries or self.maxEntries):
+            del cache[next(iter(cache))]
+
+        cache[key] = value
+        return value
+
+    def foodMask(self, state):
+        """
+        The remaining food as a bitmask, with bit `x * height + y` set for food at (x, y).
+        """
+
+        if isinstance(state, SearchState):
+            return state.food
+
+        mask = 0
+        for x, y in state.getFood().asList():
+            mask |= 1 << (x * self._height + y)
+
+        return mask
+
+    def foodField(self, foodMask):
+        """
+        The `pacai.student.distanceField` from every cell to the closest food in a bitmask.
+        """
+
+        field = self._foodFields.get(foodMask)
+        if field is not None:
+            return field
+
+        numBits = self._width * self._height
+        bits = numpy.unpackbits(numpy.frombuffer(foodMask.to_bytes((numBits + 7) // 8, 'little'),
+                dtype = numpy.uint8), bitorder = 'little')[:numBits]
+        sources = bits.reshape((self._width, self._height)).astype(bool)
+
+        return self._remember(self._foodFields, foodMask, distanceField(self.walls, sources),
+                MAX_FOOD_FIELDS)
+
+    def closestFoodDistance(self, position, foodMask):
+        """
+        The maze distance from a position to the closest food, or infinity if there is none (reachable).
+        """
+
+        if foodMask == 0:
+            return float('inf')
+
+        return distanceAt(self.foodField(foodMask), position)
+
+    def ghostDistances(self, state):
+        """
+        A (maze distance, scared timer) pair for every ghost.
+        """
+
+        row = self.table.getDistancesFrom(state.getPacmanPosition())
+        distances = []
+        for ghost in state.getGhostStates():
+            distance = row[self.table.getCellId(ghost.getPosition())]
+            distance = float('inf') if distance == UNREACHABLE else int(distance)
+            distances.append((distance, ghost.getScaredTimer()))
+
+        return distances
+
+    def stateKey(self, state, foodMask):
+        """
+        A key for everything the evaluations depend on.
+        Zobrist keys are only comparable between states of the same hasher,
+        so the hasher is part of the key.
+        """
+
+        if isinstance(state, SearchState) and state.zobrist is not None:
+            return (state.hasher, state.zobrist, state.getScore())
+
+        return (state.getPacmanPosition(), foodMask, tuple(state.getCapsules()), state.getScore(),
+                tuple((ghost.getPosition(), ghost.getScaredTimer()) for ghost in state.getGhostStates()))
+
+    def evaluate(self, name, state):
+        """
+        Get the value of `state` under the evaluation method `name` (e.g. "betterEvaluation"),
+        from the cache if it was evaluated before.
+        """
+
+        foodMask = self.foodMask(state)
+        key = (name, self.stateKey(state, foodMask))
+        value = self._values.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        return self._remember(self._values, key, getattr(self, name)(state, foodMask))
+
+    def betterEvaluation(self, state, foodMask):
+        """
+        The features of `pacai.student.multiagents.betterEvaluationFunction`, on maze distances.
+        """
+
+        position = state.getPacmanPosition()
+        value = state.getScore()
+
+        if foodMask != 0:
+            value += 10 / self.closestFoodDistance(position, foodMask)
+
+        for distance, scaredTimer in self.ghostDistances(state):
+            if scaredTimer == 0 and distance < 2:
+                value -= 100
+            elif scaredTimer > 0 and distance < 5:
+                value += 50
+
+        value -= 5 * bin(foodMask).count('1')
+        value -= 20 * len(state.getCapsules())
+
+        return value
+
+    def reflexEvaluation(self, state, foodMask):
+        """
+        The features of `pacai.student.multiagents.ReflexAgent.evaluationFunction`, on maze distances.
+        """
+
+        closestFood = 1
+        if foodMask != 0:
+            closestFood = self.closestFoodDistance(state.getPacmanPosition(), foodMask)
+
+        value = state.getScore() + 10 / closestFood
+        for distance, scaredTimer in self.ghostDistances(state):
+            if scaredTimer == 0 and distance < 2:
+                value -= 100
+            elif scaredTimer > 0 and distance < 2:
+                value += 50
+
+        return value
+
+    def hitRate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+    def __repr__(self):
+        return ('MazeEvaluator(values: %d, hits: %d (%.1f%%), food fields: %d)'
+                % (len(self._values), self.hits, 100.0 * self.hitRate(), len(self._foodFields)))
+
+def mazeBetterEvaluationFunction(currentGameState):
+    """
+    `pacai.student.multiagents.betterEvaluationFunction` on maze distances
+    (see `MazeEvaluator.betterEvaluation`).
+    """
+
+    return getMazeEvaluator(currentGameState.getWalls()).evaluate('betterEvaluation', currentGameState)
@@ -2,15 +2,32 @@ import random
 from pacai.agents.base import BaseAgent
 from pacai.agents.search.multiagent import MultiAgentSearchAgent
 import math
+import logging
+import time
+from pacai.core.eval import score
+from pacai.student.mazeEvaluation import getMazeEvaluator
+from pacai.student.mazeEvaluation import mazeBetterEvaluationFunction
+from pacai.student.parallelSearch import RootSearchPool
+from pacai.student.searchState import SearchState
+from pacai.student.transposition import DEFAULT_TABLE_SIZE
+from pacai.student.transposition import EXACT
+from pacai.student.transposition import LOWER
+from pacai.student.transposition import UPPER
+from pacai.student.transposition import TranspositionTable
+from pacai.student.transposition import ZobristHasher
 
 class ReflexAgent(BaseAgent):
     """
     A reflex agent chooses an action at each choice point by examining
     its alternatives via a state evaluation function.
+
+    With `mazeDistances` set, the same features are measured in maze distances
+    (see `pacai.student.mazeEvaluation`).
     """
 
-    def __init__(self, index, **kwargs):
+    def __init__(self, index, mazeDistances = False, **kwargs):
         super().__init__(index, **kwargs)
+        self.mazeDistances = isEnabled(mazeDistances)
 
     def getAction(self, gameState):
         """
@@ -28,6 +45,10 @@ class ReflexAgent(BaseAgent):
         An improved evaluation function for ReflexAgent.
         """
         successorGameState = currentGameState.generatePacmanSuccessor(action)
+        if self.mazeDistances:
+            evaluator = getMazeEvaluator(successorGameState.getWalls())
+            return evaluator.evaluate('reflexEvaluation', successorGameState)
+
         newPosition = successorGameState.getPacmanPosition()
         foodList = successorGameState.getFood().asList()
         ghostStates = successorGameState.getGhostStates()
@@ -54,135 +75,742 @@ class ReflexAgent(BaseAgent):
         
         return score
 
-class MinimaxAgent(MultiAgentSearchAgent):
+def isEnabled(value):
+    """
+    Agent arguments come from the command line as strings, so accept "true", "1", and "yes".
+    """
+    return str(value).lower() in ('true', '1', 'yes')
+
+class TreeSearchAgent(MultiAgentSearchAgent):
+    """
+    The parts shared by the game tree search agents below.
+
+    With `transpositionTable` set (e.g. `--agent-args transpositionTable=true`),
+    every searched node is stored in a `pacai.student.transposition.TranspositionTable`
+    of at most `tableSize` entries, keyed by an incrementally updated Zobrist hash of its state.
+    The table is kept for the whole game, so positions searched for an earlier move are reused too.
+
+    With `parallel` set to more than 1, the root actions are searched by that many worker processes
+    (see `pacai.student.parallelSearch`), which pick the same action as the sequential search.
+    The workers call the agent's `_rootActionValue(state, action, alpha)` for the value of one root action,
+    so only agents that implement it can be run in parallel.
+
+    With `compactState` set, the root state is converted to a `pacai.student.searchState.SearchState`
+    and moves are made and taken back in place instead of copying the state for every successor.
+    The evaluation function then gets a `SearchState`, so it can only use the game state methods that has.
+    """
+    def __init__(self, index, transpositionTable = False, tableSize = DEFAULT_TABLE_SIZE,
+            parallel = 0, compactState = False, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self._table = None
+        self._hasher = None
+        # The depth searches stop at, if not the tree depth (e.g. while deepening iteratively).
+        self._depthLimit = None
+        if isEnabled(transpositionTable):
+            self._table = TranspositionTable(int(tableSize))
+            self._hasher = ZobristHasher()
+
+        # Whether table values are stored relative to the score (see `_tableKey`).
+        self._scoreRelative = self.getEvaluationFunction() in SCORE_RELATIVE_EVALUATIONS
+
+        self.parallel = int(parallel)
+        if self.parallel > 1 and not hasattr(self, '_rootActionValue'):
+            raise ValueError('%s can not search in parallel.' % (type(self).__name__))
+
+        self.compactState = isEnabled(compactState)
+        self._pool = None
+        # The best root value so far of a parallel search, shared between processes.
+        self._sharedAlpha = None
+
+    def __getstate__(self):
+        """ Workers get a copy of the agent without the pool and with an empty table. """
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        state['_sharedAlpha'] = None
+        if self._table is not None:
+            state['_table'] = TranspositionTable(self._table.maxEntries)
+
+        return state
+
+    def _parallelRootValues(self, gameState, legalActions, eldestFirst = False):
+        """ Search the root actions in worker processes. """
+        if self._pool is None:
+            self._pool = RootSearchPool(self, self.parallel)
+
+        return self._pool.searchRoot(self, gameState, legalActions, eldestFirst)
+
+    def final(self, state):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+        super().final(state)
+
+    def _searchState(self, gameState):
+        """ The state to search from: a `SearchState` with `compactState`, or the game state itself. """
+        if self.compactState:
+            return SearchState.fromGameState(gameState, self._hasher)
+
+        return gameState
+
+    def _rootKey(self, state):
+        """ The Zobrist hash of the root state, or None if there is no table. """
+        if self._table is None:
+            return None
+
+        if isinstance(state, SearchState):
+            return state.zobrist
+
+        return self._hasher.hashState(state)
+
+    def _childKey(self, key, state, agentIndex, successor):
+        """ The Zobrist hash of a successor state, or None if there is no table. """
+        if key is None:
+            return None
+
+        if isinstance(successor, SearchState):
+            return successor.zobrist
+
+        return self._hasher.updateHash(key, state, agentIndex, successor)
+
+    def _makeMove(self, state, agentIndex, action, key):
+        """
+        Make a move and return (successor, its Zobrist hash, undo record).
+        A `SearchState` is moved in place (and the record is for `_unmakeMove`),
+        while a game state is copied (and the record is None).
+        """
+        if isinstance(state, SearchState):
+            record = state.apply(agentIndex, action)
+            return state, (state.zobrist if key is not None else None), record
+
+        successor = state.generateSuccessor(agentIndex, action)
+        return successor, self._childKey(key, state, agentIndex, successor), None
+
+    def _unmakeMove(self, state, record):
+        if record is not None:
+            state.undo(record)
+
+    def _tableKey(self, key, state, depth, agentIndex):
+        """
+        The table key of a node, the number of plies left below it,
+        and the offset its value is stored relative to.
+        For an evaluation function in `SCORE_RELATIVE_EVALUATIONS`, the node's value less its score
+        only depends on its position, so the entry is keyed by the position alone and stores that difference
+        (and positions searched for earlier moves, at other scores, are reused).
+        Otherwise the score is part of the key.
+        """
+        numAgents = state.getNumAgents()
+        depthLimit = self._depthLimit or self.getTreeDepth()
+        plies = max(0, (depthLimit - depth) * numAgents - agentIndex)
+        if self._scoreRelative:
+            return (key, agentIndex), plies, state.getScore()
+
+        return (key, agentIndex, state.getScore()), plies, 0
+
+    def _logSearch(self):
+        if self._table is not None:
+            logging.debug('%s' % (self._table))
+
+class MinimaxAgent(TreeSearchAgent):
     """ A minimax agent. """
     def __init__(self, index, **kwargs):
         super().__init__(index, **kwargs)
     
     def getAction(self, gameState):
         """ Returns the minimax action from the current gameState. """
-        def minimax(state, depth, agentIndex):
-            if depth == self.getTreeDepth() or state.isWin() or state.isLose():
-                return self.getEvaluationFunction()(state)
-            
-            numAgents = state.getNumAgents()
-            nextAgent = (agentIndex + 1) % numAgents
-            nextDepth = depth + 1 if nextAgent == 0 else depth
-            
-            legalActions = state.getLegalActions(agentIndex)
-            if not legalActions:
-                return self.getEvaluationFunction()(state)
-            
-            scores = [
-                minimax(state.generateSuccessor(agentIndex, action), nextDepth, nextAgent)
-                for action in legalActions
-            ]
-            
-            return max(scores) if agentIndex == 0 else min(scores)
-        
         legalActions = gameState.getLegalActions(0)
         if not legalActions:
             return None
         
-        bestAction = max(
-            legalActions,
-            key=lambda action: minimax(
-                gameState.generateSuccessor(0, action),
-                1, 1
-            )
-        )
-        return bestAction
+        if self.parallel > 1:
+            values = self._parallelRootValues(gameState, legalActions)
+            return legalActions[values.index(max(values))]
 
-class AlphaBetaAgent(MultiAgentSearchAgent):
-    """ A minimax agent with alpha-beta pruning. """
-    def __init__(self, index, **kwargs):
+        state = self._searchState(gameState)
+        rootKey = self._rootKey(state)
+        values = []
+        for action in legalActions:
+            successor, key, record = self._makeMove(state, 0, action, rootKey)
+            values.append(self.minimax(successor, 1, 1, key))
+            self._unmakeMove(state, record)
+
+        self._logSearch()
+        return legalActions[values.index(max(values))]
+
+    def _rootActionValue(self, state, action, alpha):
+        state = self._searchState(state)
+        successor, key, _ = self._makeMove(state, 0, action, self._rootKey(state))
+        return self.minimax(successor, 1, 1, key)
+
+    def minimax(self, state, depth, agentIndex, key = None):
+        if depth == self.getTreeDepth() or state.isWin() or state.isLose():
+            return self.getEvaluationFunction()(state)
+        
+        numAgents = state.getNumAgents()
+        nextAgent = (agentIndex + 1) % numAgents
+        nextDepth = depth + 1 if nextAgent == 0 else depth
+        
+        legalActions = state.getLegalActions(agentIndex)
+        if not legalActions:
+            return self.getEvaluationFunction()(state)
+        
+        if key is not None:
+            tableKey, plies, offset = self._tableKey(key, state, depth, agentIndex)
+            value, _ = self._table.probe(tableKey, plies, offset = offset)
+            if value is not None:
+                return value
+
+        scores = []
+        for action in legalActions:
+            successor, childKey, record = self._makeMove(state, agentIndex, action, key)
+            scores.append(self.minimax(successor, nextDepth, nextAgent, childKey))
+            self._unmakeMove(state, record)
+        
+        value = max(scores) if agentIndex == 0 else min(scores)
+        if key is not None:
+            self._table.store(tableKey, plies, value, offset = offset)
+
+        return value
+
+class SearchTimeout(Exception):
+    """ Raised inside a search when its time budget runs out. """
+    pass
+
+class AlphaBetaAgent(TreeSearchAgent):
+    """
+    A minimax agent with alpha-beta pruning.
+    With a transposition table, the best action stored for a node is searched first.
+
+    With `timeBudget` set (in seconds, e.g. `--agent-args timeBudget=0.5`),
+    the search deepens iteratively from depth 1 up to the tree depth,
+    and stops when the budget runs out.
+    The action of the deepest iteration that finished is used
+    (the first iteration always finishes, so there is always an action).
+    Each iteration searches the principal variation of the previous one first.
+    Time budgeted searches always run in this process (`parallel` is not used).
+
+    The best value found so far at the root always bounds the search of the later root actions.
+    With `pvs` set, where the first child of a node is expected to be the best (it is the transposition table's
+    or the previous iteration's best move), the other children are searched with a null window
+    (principal variation search): a child is only searched again, with the window narrowed by the
+    null window result, if it can still be better.
+    Without such a hint, null windows cost more re-searches in Pacman trees than they save,
+    so those nodes only get the tighter bounds.
+    With `ordering` set, Pacman and ghost moves are ordered by killer moves
+    (the moves that last caused a cutoff at the same ply) and then by the history heuristic
+    (how often and how deep each agent's move from a position has caused a cutoff or been the best).
+    Cutoffs only happen when a value is strictly outside of its window,
+    so all of these options pick exactly the same action as the plain search.
+    The number of searched nodes is logged after each move.
+    """
+    NUM_KILLERS = 2
+
+    def __init__(self, index, timeBudget = None, pvs = False, ordering = False, **kwargs):
         super().__init__(index, **kwargs)
+
+        self.timeBudget = float(timeBudget) if timeBudget is not None else None
+        self.pvs = isEnabled(pvs)
+        self.ordering = isEnabled(ordering)
+
+        self.nodeCount = 0
+        self._deadline = None
+        self._previousLine = []
+        self._killers = {}
+        self._history = {}
     
     def getAction(self, gameState):
         """ Returns the minimax action using alpha-beta pruning. """
-        def alphabeta(state, depth, agentIndex, alpha, beta):
-            if depth == self.getTreeDepth() or state.isWin() or state.isLose():
-                return self.getEvaluationFunction()(state)
-            
-            numAgents = state.getNumAgents()
-            nextAgent = (agentIndex + 1) % numAgents
-            nextDepth = depth + 1 if nextAgent == 0 else depth
-            legalActions = state.getLegalActions(agentIndex)
-            if not legalActions:
-                return self.getEvaluationFunction()(state)
-            
-            if agentIndex == 0:
-                value = float('-inf')
-                for action in legalActions:
-                    successor = state.generateSuccessor(agentIndex, action)
-                    value = max(value, alphabeta(successor, nextDepth, nextAgent, alpha, beta))
-                    if value > beta:
-                        return value
-                    alpha = max(alpha, value)
-                return value
-            else:
-                value = float('inf')
-                for action in legalActions:
-                    successor = state.generateSuccessor(agentIndex, action)
-                    value = min(value, alphabeta(successor, nextDepth, nextAgent, alpha, beta))
-                    if value < alpha:
-                        return value
-                    beta = min(beta, value)
-                return value
-        
         legalActions = gameState.getLegalActions(0)
         if not legalActions:
             return None
         
-        bestAction = max(
-            legalActions,
-            key=lambda action: alphabeta(
-                gameState.generateSuccessor(0, action),
-                1, 1, float('-inf'), float('inf')
-            )
-        )
+        self.nodeCount = 0
+        self._startMove()
+
+        if self.timeBudget is not None:
+            return self._iterativeDeepening(self._searchState(gameState), legalActions)
+
+        self._depthLimit = self.getTreeDepth()
+        if self.parallel > 1:
+            values = self._parallelRootValues(gameState, legalActions, eldestFirst = True)
+            return legalActions[values.index(max(values))]
+
+        values = self._searchRoot(self._searchState(gameState), legalActions)
+
+        logging.debug('Alpha-beta searched %d nodes.' % (self.nodeCount))
+        self._logSearch()
+        return legalActions[values.index(max(values))]
+
+    def _rootActionValue(self, state, action, alpha):
+        self.nodeCount = 0
+        self._startMove()
+        self._depthLimit = self.getTreeDepth()
+
+        state = self._searchState(state)
+        successor, key, _ = self._makeMove(state, 0, action, self._rootKey(state))
+
+        # There is no principal variation to trust here, so root actions are not scouted with a null window
+        # (the shared alpha still bounds the search).
+        return self.alphabeta(successor, 1, 1, alpha, float('inf'), key)
+
+    def _startMove(self):
+        """ Forget the killer moves of the last move, and age its history. """
+        self._killers = {}
+        if self.ordering:
+            self._history = {move: count // 2 for move, count in self._history.items() if count > 1}
+
+    def _searchRoot(self, gameState, legalActions, line = None):
+        """
+        Get the value of every root action (or a value below the best one for actions that are worse).
+        Every action is searched with the best value so far as its alpha,
+        and, with `pvs` and a previous iteration to follow,
+        actions after the first are scouted with a null window before a full search.
+        The best action of the previous iteration is searched first,
+        but ties still go to the first of the legal actions (cutoffs are strict, so a tie keeps its value).
+        If `line` is given, it is filled with the principal variation.
+        """
+        rootKey = self._rootKey(gameState)
+        values = [None] * len(legalActions)
+        lines = [None] * len(legalActions)
+
+        order = list(range(len(legalActions)))
+        hinted = False
+        if self._previousLine and self._previousLine[0] in legalActions:
+            first = legalActions.index(self._previousLine[0])
+            order = [first] + [index for index in order if index != first]
+            hinted = True
+
+        alpha = float('-inf')
+        for index in order:
+            action = legalActions[index]
+            successor, key, record = self._makeMove(gameState, 0, action, rootKey)
+
+            childLine = None
+            pvIndex = None
+            if line is not None:
+                childLine = []
+                if self._previousLine[:1] == [action]:
+                    pvIndex = 1
+
+            if not self.pvs or index == order[0] or not hinted:
+                value = self.alphabeta(successor, 1, 1, alpha, float('inf'), key, childLine, pvIndex)
+            else:
+                value = self.alphabeta(successor, 1, 1, alpha, alpha, key, childLine, pvIndex)
+                if value > alpha:
+                    value = self.alphabeta(successor, 1, 1, value, float('inf'),
+                            key, childLine, pvIndex)
+
+            self._unmakeMove(gameState, record)
+            values[index] = value
+            lines[index] = childLine
+            alpha = max(alpha, value)
+
+        if line is not None:
+            bestIndex = values.index(max(values))
+            line[:] = [legalActions[bestIndex]] + lines[bestIndex]
+
+        return values
+
+    def _iterativeDeepening(self, gameState, legalActions):
+        startTime = time.perf_counter()
+        self._previousLine = []
+        bestAction = None
+        completedDepth = 0
+
+        for depthLimit in range(1, self.getTreeDepth() + 1):
+            self._depthLimit = depthLimit
+
+            # The first iteration is always allowed to finish.
+            if depthLimit > 1:
+                self._deadline = startTime + self.timeBudget
+
+            line = []
+            try:
+                values = self._searchRoot(gameState, legalActions, line)
+            except SearchTimeout:
+                break
+            finally:
+                self._deadline = None
+
+            bestAction = legalActions[values.index(max(values))]
+            completedDepth = depthLimit
+            self._previousLine = line
+
+            if time.perf_counter() - startTime >= self.timeBudget:
+                break
+
+        logging.debug('Iterative deepening finished depth %d of %d in %.3fs (%d nodes).'
+                % (completedDepth, self.getTreeDepth(), time.perf_counter() - startTime,
+                    self.nodeCount))
+        self._logSearch()
         return bestAction
 
-class ExpectimaxAgent(MultiAgentSearchAgent):
-    """ An expectimax agent. """
-    def __init__(self, index, **kwargs):
+    def _orderActions(self, state, agentIndex, ply, legalActions):
+        """ Killer moves first, then the rest by their history score. """
+        position = state.getAgentState(agentIndex).getPosition()
+        killers = [action for action in self._killers.get(ply, ()) if action in legalActions]
+        rest = [action for action in legalActions if action not in killers]
+        rest.sort(key = lambda action: -self._history.get((agentIndex, position, action), 0))
+        return killers + rest
+
+    def _recordBest(self, state, agentIndex, ply, action, plies, cutoff):
+        """ Credit a move that caused a cutoff (or was the best) for move ordering. """
+        position = state.getAgentState(agentIndex).getPosition()
+        move = (agentIndex, position, action)
+        self._history[move] = self._history.get(move, 0) + (plies + 1) ** 2
+
+        if cutoff:
+            killers = self._killers.setdefault(ply, [])
+            if action not in killers:
+                killers.insert(0, action)
+                del killers[AlphaBetaAgent.NUM_KILLERS:]
+
+    def alphabeta(self, state, depth, agentIndex, alpha, beta, key = None,
+            line = None, pvIndex = None):
+        """
+        The value of a node, searched with the window (alpha, beta).
+        If `line` is given, it is filled with the principal variation below this node.
+        If the node is on the principal variation of the previous iteration,
+        `pvIndex` is the index of its move in that variation.
+        """
+        self.nodeCount += 1
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            raise SearchTimeout()
+
+        # Another worker may have found a better root action in the meantime
+        # (but the window is never inverted, e.g. for a null window search).
+        if self._sharedAlpha is not None:
+            alpha = max(alpha, min(self._sharedAlpha.value, beta))
+
+        if depth == self._depthLimit or state.isWin() or state.isLose():
+            return self.getEvaluationFunction()(state)
+        
+        numAgents = state.getNumAgents()
+        nextAgent = (agentIndex + 1) % numAgents
+        nextDepth = depth + 1 if nextAgent == 0 else depth
+        legalActions = state.getLegalActions(agentIndex)
+        if not legalActions:
+            return self.getEvaluationFunction()(state)
+        
+        ply = (depth - 1) * numAgents + agentIndex
+        plies = max(0, (self._depthLimit - depth) * numAgents - agentIndex)
+        if self.ordering:
+            legalActions = self._orderActions(state, agentIndex, ply, legalActions)
+
+        # Whether the first action is expected to be the best (and so worth scouting the others against).
+        hinted = False
+        if key is not None:
+            tableKey, plies, offset = self._tableKey(key, state, depth, agentIndex)
+            value, bestAction = self._table.probe(tableKey, plies, alpha, beta, offset)
+            if value is not None:
+                return value
+
+            if bestAction in legalActions:
+                hinted = True
+                legalActions = [bestAction] + [action for action in legalActions
+                        if action != bestAction]
+
+        pvAction = None
+        if pvIndex is not None and pvIndex < len(self._previousLine):
+            pvAction = self._previousLine[pvIndex]
+            if pvAction in legalActions:
+                hinted = True
+                legalActions = [pvAction] + [action for action in legalActions
+                        if action != pvAction]
+
+        startAlpha = alpha
+        startBeta = beta
+        bestAction = None
+        bestLine = []
+        cutoff = False
+
+        if agentIndex == 0:
+            value = float('-inf')
+        else:
+            value = float('inf')
+
+        for action in legalActions:
+            successor, childKey, record = self._makeMove(state, agentIndex, action, key)
+            childLine = [] if line is not None else None
+            childPVIndex = pvIndex + 1 if action == pvAction else None
+
+            bound = alpha if agentIndex == 0 else beta
+            if self.pvs and hinted and bestAction is not None and math.isfinite(bound):
+                # Only check whether this child can be better than the best one so far,
+                # and search it properly if it can.
+                # The check bounds the child's value from one side, which narrows the window of that search.
+                childValue = self.alphabeta(successor, nextDepth, nextAgent, bound, bound,
+                        childKey, childLine, childPVIndex)
+                if agentIndex == 0 and alpha < childValue <= beta:
+                    childValue = self.alphabeta(successor, nextDepth, nextAgent, childValue, beta,
+                            childKey, childLine, childPVIndex)
+                elif agentIndex != 0 and alpha <= childValue < beta:
+                    childValue = self.alphabeta(successor, nextDepth, nextAgent, alpha, childValue,
+                            childKey, childLine, childPVIndex)
+            else:
+                childValue = self.alphabeta(successor, nextDepth, nextAgent, alpha, beta,
+                        childKey, childLine, childPVIndex)
+
+            self._unmakeMove(state, record)
+
+            if agentIndex == 0:
+                if childValue > value or bestAction is None:
+                    value = childValue
+                    bestAction = action
+                    bestLine = childLine
+                if value > beta:
+                    cutoff = True
+                    break
+                alpha = max(alpha, value)
+            else:
+                if childValue < value or bestAction is None:
+                    value = childValue
+                    bestAction = action
+                    bestLine = childLine
+                if value < alpha:
+                    cutoff = True
+                    break
+                beta = min(beta, value)
+
+        if self.ordering:
+            self._recordBest(state, agentIndex, ply, bestAction, plies, cutoff)
+
+        if line is not None:
+            line[:] = [bestAction] + bestLine
+
+        if key is not None:
+            if value < startAlpha:
+                bound = UPPER
+            elif value > startBeta:
+                bound = LOWER
+            elif (self._sharedAlpha is not None
+                    and value <= max(startAlpha, min(self._sharedAlpha.value, startBeta))):
+                # Children may have been cut off against a shared alpha that rose during this search.
+                bound = UPPER
+            else:
+                bound = EXACT
+
+            self._table.store(tableKey, plies, value, bound, bestAction, offset)
+
+        return value
+
+class ExpectimaxAgent(TreeSearchAgent):
+    """
+    An expectimax agent.
+
+    With `pruning` set to "star1", chance nodes are cut off early
+    once known bounds on the evaluation function show that their value can no longer matter
+    (the Star1 algorithm of Ballard).
+    The bounds come from `EVALUATION_BOUNDS`, so this only works for evaluation functions listed there.
+    A ghost's node is pruned as soon as its average can not reach the window left by the nodes above,
+    assuming the remaining ghost moves score as well (or badly) as the bounds allow.
+    This returns the same values (and so picks the same actions) as the plain search.
+
+    With `samples` set, each ghost only considers that many of its moves (picked at random),
+    which approximates the expectation for searches that would otherwise be too deep.
+    """
+    # Windows are widened by this much, so rounding in the bound arithmetic never cuts off a tie.
+    BOUND_SLACK = 1e-6
+
+    def __init__(self, index, pruning = None, samples = None, **kwargs):
         super().__init__(index, **kwargs)
+
+        self.pruning = None if pruning is None else str(pruning).lower()
+        if self.pruning not in (None, 'none', 'star1'):
+            raise ValueError('Unknown expectimax pruning: "%s".' % (pruning))
+
+        if self.pruning == 'none':
+            self.pruning = None
+
+        self.samples = int(samples) if samples is not None else None
+        self.nodeCount = 0
+        self._bounds = None
     
     def getAction(self, gameState):
         """ Returns the expectimax action from the current gameState. """
-        def expectimax(state, depth, agentIndex):
-            if depth == self.getTreeDepth() or state.isWin() or state.isLose():
-                return self.getEvaluationFunction()(state)
-            
-            numAgents = state.getNumAgents()
-            nextAgent = (agentIndex + 1) % numAgents
-            nextDepth = depth + 1 if nextAgent == 0 else depth
-            legalActions = state.getLegalActions(agentIndex)
-            if not legalActions:
-                return self.getEvaluationFunction()(state)
-            
-            if agentIndex == 0:
-                return max(
-                    expectimax(state.generateSuccessor(agentIndex, action), nextDepth, nextAgent)
-                    for action in legalActions
-                )
-            else:
-                return sum(
-                    expectimax(state.generateSuccessor(agentIndex, action), nextDepth, nextAgent)
-                    for action in legalActions
-                ) / len(legalActions)
-        
         legalActions = gameState.getLegalActions(0)
         if not legalActions:
             return None
         
-        return max(
-            legalActions,
-            key=lambda action: expectimax(
-                gameState.generateSuccessor(0, action),
-                1, 1
-            )
-        )
+        self._startSearch()
+        if self.pruning is not None and self._bounds is None:
+            logging.warning('No bounds are known for this evaluation function, not pruning.')
+
+        if self.parallel > 1:
+            values = self._parallelRootValues(gameState, legalActions)
+            return legalActions[values.index(max(values))]
+
+        state = self._searchState(gameState)
+        rootKey = self._rootKey(state)
+        values = []
+        alpha = float('-inf')
+        for action in legalActions:
+            successor, key, record = self._makeMove(state, 0, action, rootKey)
+
+            if self._bounds is None and self.samples is None:
+                values.append(self.expectimax(successor, 1, 1, key))
+            else:
+                values.append(self.expectimaxPruned(successor, 1, 1, alpha, float('inf'), key))
+                alpha = max(alpha, values[-1])
+
+            self._unmakeMove(state, record)
+
+        if self._bounds is not None or self.samples is not None:
+            logging.debug('Expectimax searched %d nodes.' % (self.nodeCount))
+
+        self._logSearch()
+        return legalActions[values.index(max(values))]
+
+    def _startSearch(self):
+        self.nodeCount = 0
+        self._depthLimit = self.getTreeDepth()
+        self._bounds = None
+        if self.pruning is not None:
+            self._bounds = EVALUATION_BOUNDS.get(self.getEvaluationFunction())
+
+    def _rootActionValue(self, state, action, alpha):
+        self._startSearch()
+
+        state = self._searchState(state)
+        successor, key, _ = self._makeMove(state, 0, action, self._rootKey(state))
+        if self._bounds is None and self.samples is None:
+            return self.expectimax(successor, 1, 1, key)
+
+        return self.expectimaxPruned(successor, 1, 1, alpha, float('inf'), key)
+
+    def expectimax(self, state, depth, agentIndex, key = None):
+        if depth == self.getTreeDepth() or state.isWin() or state.isLose():
+            return self.getEvaluationFunction()(state)
+        
+        numAgents = state.getNumAgents()
+        nextAgent = (agentIndex + 1) % numAgents
+        nextDepth = depth + 1 if nextAgent == 0 else depth
+        legalActions = state.getLegalActions(agentIndex)
+        if not legalActions:
+            return self.getEvaluationFunction()(state)
+        
+        if key is not None:
+            tableKey, plies, offset = self._tableKey(key, state, depth, agentIndex)
+            value, _ = self._table.probe(tableKey, plies, offset = offset)
+            if value is not None:
+                return value
+
+        values = []
+        for action in legalActions:
+            successor, childKey, record = self._makeMove(state, agentIndex, action, key)
+            values.append(self.expectimax(successor, nextDepth, nextAgent, childKey))
+            self._unmakeMove(state, record)
+
+        if agentIndex == 0:
+            value = max(values)
+        else:
+            value = sum(values) / len(legalActions)
+
+        if key is not None:
+            self._table.store(tableKey, plies, value, offset = offset)
+
+        return value
+
+    def expectimaxPruned(self, state, depth, agentIndex, alpha, beta, key = None):
+        """
+        The expectimax value of a node searched with the window (alpha, beta).
+        Like alpha-beta, a value strictly below alpha (above beta) is only an upper (lower) bound,
+        and anything inside the window is exact.
+        """
+        self.nodeCount += 1
+        if depth == self._depthLimit or state.isWin() or state.isLose():
+            return self.getEvaluationFunction()(state)
+
+        numAgents = state.getNumAgents()
+        nextAgent = (agentIndex + 1) % numAgents
+        nextDepth = depth + 1 if nextAgent == 0 else depth
+        legalActions = state.getLegalActions(agentIndex)
+        if not legalActions:
+            return self.getEvaluationFunction()(state)
+
+        if key is not None:
+            tableKey, plies, offset = self._tableKey(key, state, depth, agentIndex)
+            value, _ = self._table.probe(tableKey, plies, alpha, beta, offset)
+            if value is not None:
+                return value
+
+        startAlpha = alpha
+        startBeta = beta
+
+        if agentIndex == 0:
+            value = float('-inf')
+            for action in legalActions:
+                successor, childKey, record = self._makeMove(state, agentIndex, action, key)
+                value = max(value, self.expectimaxPruned(successor, nextDepth, nextAgent, alpha, beta,
+                        childKey))
+                self._unmakeMove(state, record)
+                if value > beta:
+                    break
+                alpha = max(alpha, value)
+        else:
+            value = self._chanceValue(state, depth, agentIndex, legalActions, alpha, beta, key)
+
+        if key is not None:
+            if value < startAlpha:
+                bound = UPPER
+            elif value > startBeta:
+                bound = LOWER
+            else:
+                bound = EXACT
+
+            self._table.store(tableKey, plies, value, bound, offset = offset)
+
+        return value
+
+    def _chanceValue(self, state, depth, agentIndex, legalActions, alpha, beta, key):
+        """
+        The average value over a ghost's moves, cut off (Star1) when it falls outside the window.
+        """
+        numAgents = state.getNumAgents()
+        nextAgent = (agentIndex + 1) % numAgents
+        nextDepth = depth + 1 if nextAgent == 0 else depth
+
+        if self.samples is not None and len(legalActions) > self.samples:
+            legalActions = random.sample(legalActions, self.samples)
+
+        count = len(legalActions)
+
+        def childValue(index, childAlpha, childBeta):
+            successor, childKey, record = self._makeMove(state, agentIndex, legalActions[index], key)
+            value = self.expectimaxPruned(successor, nextDepth, nextAgent, childAlpha, childBeta, childKey)
+            self._unmakeMove(state, record)
+            return value
+
+        if self._bounds is None:
+            total = 0.0
+            for index in range(count):
+                total += childValue(index, float('-inf'), float('inf'))
+
+            return total / count
+
+        slack = ExpectimaxAgent.BOUND_SLACK
+        pacmanMoves = self._depthLimit - depth - 1
+        low, high = self._bounds(state, pacmanMoves)
+
+        # Keep the window of each child just wide enough to matter for this node.
+        total = 0.0
+        for index in range(count):
+            restLow = (count - index - 1) * low
+            restHigh = (count - index - 1) * high
+            childAlpha = count * alpha - total - restHigh - slack
+            childBeta = count * beta - total - restLow + slack
+
+            value = childValue(index, childAlpha, childBeta)
+            total += value
+
+            if value < childAlpha:
+                return (total + restHigh) / count
+
+            if value > childBeta:
+                return (total + restLow) / count
+
+        return total / count
     
 def betterEvaluationFunction(currentGameState):
     """
@@ -218,4 +846,88 @@ def betterEvaluationFunction(currentGameState):
     
     score -= 20 * len(capsuleList)
     
-    return score
\ No newline at end of file
+    return score
+
+# How close a ghost has to be to Pacman to catch him (or be eaten), as in the Pacman rules.
+COLLISION_TOLERANCE = 0.7
+
+def ghostGaps(state, pacmanMoves):
+    """
+    For each ghost, how much further apart than they can close in on each other it and Pacman are:
+    the Manhattan distance between them, less how far both can move within `pacmanMoves` more Pacman moves
+    (every ghost gets one more move than Pacman, since they move after him).
+    A ghost can only be within a distance `d` of Pacman later on if its gap is below `d`.
+    """
+    pacmanX, pacmanY = state.getPacmanPosition()
+    reach = 2 * pacmanMoves + 1
+    return [abs(pacmanX - x) + abs(pacmanY - y) - reach for x, y in state.getGhostPositions()]
+
+def betterEvaluationBounds(state, pacmanMoves):
+    """
+    Bounds on `betterEvaluationFunction` over every state that can be reached from `state`
+    within `pacmanMoves` more Pacman moves (and the ghost moves in between).
+    At worst Pacman pays the time penalty, every ghost that can reach him is next to him,
+    and he loses (-500) if one can catch him.
+    At best he eats a capsule (+20 capsule term) or else food (+10 score, +5 food term) on every move,
+    wins (+500), eats every ghost that can reach him once per capsule (+200), and has them all scared nearby.
+    """
+    numFood = state.getNumFood()
+    numCapsules = len(state.getCapsules())
+    base = state.getScore() - 5 * numFood - 20 * numCapsules
+
+    # Euclidean distances below 2 (or 5) mean Manhattan distances below 2 * sqrt(2) (or 5 * sqrt(2)).
+    gaps = ghostGaps(state, pacmanMoves)
+    catchers = sum(1 for gap in gaps if gap <= COLLISION_TOLERANCE)
+    dangerous = sum(1 for gap in gaps if gap < 2 * math.sqrt(2))
+    nearby = sum(1 for gap in gaps if gap < 5 * math.sqrt(2))
+
+    low = base - pacmanMoves - 100 * dangerous
+    if catchers > 0:
+        low -= 500
+
+    capsulesEaten = min(pacmanMoves, numCapsules)
+    foodEaten = min(pacmanMoves - capsulesEaten, numFood)
+    ghostsEaten = catchers * (1 + capsulesEaten)
+    high = base + 20 * capsulesEaten + 15 * foodEaten + 200 * ghostsEaten + 10 + 50 * nearby
+    if numFood <= pacmanMoves:
+        high += 500
+
+    return low, high
+
+def scoreBounds(state, pacmanMoves):
+    """
+    Bounds on the score of every state that can be reached from `state` within `pacmanMoves` more Pacman moves.
+    """
+    numFood = state.getNumFood()
+    numCapsules = len(state.getCapsules())
+    catchers = sum(1 for gap in ghostGaps(state, pacmanMoves) if gap <= COLLISION_TOLERANCE)
+
+    low = state.getScore() - pacmanMoves
+    if catchers > 0:
+        low -= 500
+
+    high = (state.getScore() + 10 * min(pacmanMoves, numFood)
+            + 200 * catchers * (1 + min(pacmanMoves, numCapsules)))
+    if numFood <= pacmanMoves:
+        high += 500
+
+    return low, high
+
+# Evaluation functions with known bounds (see `ExpectimaxAgent`).
+EVALUATION_BOUNDS = {
+    betterEvaluationFunction: betterEvaluationBounds,
+    # Maze distances (from the nearest cell) are at most half a cell shorter than Manhattan ones,
+    # which the margins of these bounds cover.
+    mazeBetterEvaluationFunction: betterEvaluationBounds,
+    score: scoreBounds,
+}
+
+# Evaluation functions that are the score plus something that only depends on the position.
+# No move's change to the score depends on the score itself,
+# so the value of a searched node less its score only depends on its position too
+# (see `TreeSearchAgent._tableKey`).
+SCORE_RELATIVE_EVALUATIONS = {
+    betterEvaluationFunction,
+    mazeBetterEvaluationFunction,
+    score,
+}
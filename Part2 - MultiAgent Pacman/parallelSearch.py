@@ -0,0 +1,97 @@
+"""
+Root-parallel game tree search for the agents in `pacai.student.multiagents`.
+
+The root actions of a search are independent of each other,
+so they are handed out to a pool of worker processes.
+Each worker holds its own copy of the agent (with its own transposition table, if any),
+which it uses to search the root actions it is given.
+
+The root state is pickled once per move.
+Every task carries the same bytes and a move id,
+so a worker only unpickles the state for the first task of each move it gets.
+
+For alpha-beta, the best root value found so far is shared by all workers through a
+`multiprocessing.Value` (handed to them when the pool starts), so every search can prune against it.
+The first root action is searched before the others are handed out (young brothers wait),
+so the bound is useful from the start.
+Searches only cut off when a value is strictly below the bound,
+so every root action that could be the best gets its exact value
+and the chosen action (the first of the best ones) is the same as for a sequential search.
+"""
+
+import multiprocessing
+import pickle
+
+# The state of this process, if it is a worker.
+_worker = {}
+
+def _initWorker(agent, sharedAlpha):
+    agent._sharedAlpha = sharedAlpha
+
+    _worker['agent'] = agent
+    _worker['moveId'] = None
+    _worker['state'] = None
+
+def _searchAction(task):
+    """
+    Search one root action (in a worker) and return (action index, value).
+    """
+
+    moveId, stateBytes, actionIndex = task
+    if _worker['moveId'] != moveId:
+        _worker['state'] = pickle.loads(stateBytes)
+        _worker['moveId'] = moveId
+
+    agent = _worker['agent']
+    state = _worker['state']
+    action = state.getLegalActions(0)[actionIndex]
+
+    value = agent._rootActionValue(state, action, agent._sharedAlpha.value)
+    raiseAlpha(agent._sharedAlpha, value)
+
+    return actionIndex, value
+
+def raiseAlpha(sharedAlpha, value):
+    with sharedAlpha.get_lock():
+        if value > sharedAlpha.value:
+            sharedAlpha.value = value
+
+class RootSearchPool(object):
+    """
+    A pool of worker processes that search the root actions of an agent.
+    The agent must have a `_rootActionValue(state, action, alpha)` method.
+    """
+
+    def __init__(self, agent, processes):
+        self.sharedAlpha = multiprocessing.Value('d', float('-inf'))
+        self._pool = multiprocessing.Pool(processes, _initWorker, (agent, self.sharedAlpha))
+        self._moveId = 0
+
+    def searchRoot(self, agent, gameState, legalActions, eldestFirst = False):
+        """
+        Get the value of every root action (values below the best one may only be upper bounds).
+        With `eldestFirst`, the first action is searched here before the rest are handed out.
+        """
+
+        self._moveId += 1
+        self.sharedAlpha.value = float('-inf')
+
+        values = [None] * len(legalActions)
+        indices = list(range(len(legalActions)))
+
+        if eldestFirst:
+            values[0] = agent._rootActionValue(gameState, legalActions[0], float('-inf'))
+            raiseAlpha(self.sharedAlpha, values[0])
+            indices = indices[1:]
+
+        stateBytes = pickle.dumps(gameState, pickle.HIGHEST_PROTOCOL)
+        tasks = [(self._moveId, stateBytes, index) for index in indices]
+
+        for index, value in self._pool.imap_unordered(_searchAction, tasks):
+            values[index] = value
+
+        return values
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
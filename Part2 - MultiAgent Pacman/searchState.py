@@ -0,0 +1,399 @@
+"""
+A compact game state for the game tree searches in `pacai.student.multiagents`.
+
+`generateSuccessor` on a normal game state copies the whole state (food grid included) for every move.
+A `SearchState` instead keeps just what the Pacman rules need:
+agent positions, directions, and scared timers in arrays, food as one integer bitmask,
+capsules as a tuple, and the score.
+Moves are made in place with `SearchState.apply`, which returns a record that `SearchState.undo`
+uses to take the move back, so a whole search can run on a single state.
+
+The rules are the same as in `pacai.bin.pacman`:
+Pacman pays 1 point per move, gets 10 per food and 500 for eating the last one (a win),
+and scares every ghost for 40 moves when he eats a capsule.
+Scared ghosts move at half speed, and are put back on a cell when their timer runs out.
+Ghosts can not stop, and only turn back when there is no other way to go.
+A ghost within 0.7 of Pacman either gets eaten (200 points, and it goes back to its start)
+or, if it is not scared, catches him (-500 points, a loss).
+
+A `SearchState` also has the parts of the game state API that evaluation functions usually use
+(`getPacmanPosition`, `getFood`, `getGhostStates`, `getCapsules`, `getScore`, ...),
+so those can be used on it unchanged.
+"""
+
+from array import array
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+
+SCARED_TIME = 40
+COLLISION_TOLERANCE = 0.7
+TIME_PENALTY = 1
+FOOD_SCORE = 10
+WIN_SCORE = 500
+LOSE_SCORE = 500
+GHOST_SCORE = 200
+
+# The order in which the Pacman rules list possible actions.
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+
+class AgentView(object):
+    """
+    A read-only snapshot of one agent, with the agent state methods evaluation functions use.
+    """
+
+    __slots__ = ('isPacman', '_position', '_direction', '_scaredTimer')
+
+    def __init__(self, isPacman, position, direction, scaredTimer):
+        self.isPacman = isPacman
+        self._position = position
+        self._direction = direction
+        self._scaredTimer = scaredTimer
+
+    def getPosition(self):
+        return self._position
+
+    def getDirection(self):
+        return self._direction
+
+    def getScaredTimer(self):
+        return self._scaredTimer
+
+    def isScared(self):
+        return self._scaredTimer > 0
+
+class FoodView(object):
+    """
+    A read-only view of a food bitmask that works like a `pacai.core.grid.Grid` of booleans.
+    """
+
+    __slots__ = ('_food', '_width', '_height')
+
+    def __init__(self, food, width, height):
+        self._food = food
+        self._width = width
+        self._height = height
+
+    def __getitem__(self, x):
+        column = self._food >> (x * self._height)
+        return [bool((column >> y) & 1) for y in range(self._height)]
+
+    def getWidth(self):
+        return self._width
+
+    def getHeight(self):
+        return self._height
+
+    def count(self, item = True):
+        count = bin(self._food).count('1')
+        return count if item else self._width * self._height - count
+
+    def asList(self, key = True):
+        """ Positions in the same (column major) order as `pacai.core.grid.Grid.asList`. """
+        if not key:
+            return [(x, y) for x in range(self._width) for y in range(self._height)
+                    if not (self._food >> (x * self._height + y)) & 1]
+
+        positions = []
+        food = self._food
+        while food:
+            lowest = food & -food
+            index = lowest.bit_length() - 1
+            positions.append((index // self._height, index % self._height))
+            food ^= lowest
+
+        return positions
+
+class SearchState(object):
+    """
+    A Pacman game state for searching, with in-place moves.
+    Agent 0 is Pacman, and the other agents are ghosts.
+    If a `pacai.student.transposition.ZobristHasher` is given,
+    `zobrist` is kept up to date with the state's Zobrist key.
+    """
+
+    __slots__ = ('walls', 'height', 'numAgents', 'xs', 'ys', 'directions', 'scaredTimers',
+            'starts', 'food', 'numFood', 'capsules', 'score', 'win', 'lose', 'hasher', 'zobrist')
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def fromGameState(gameState, hasher = None):
+        """
+        Convert a normal game state.
+        """
+
+        state = SearchState()
+        walls = gameState.getWalls()
+        state.walls = walls
+        state.height = walls.getHeight()
+        state.numAgents = gameState.getNumAgents()
+
+        agentStates = [gameState.getAgentState(index) for index in range(state.numAgents)]
+        state.xs = array('d', [agent.getPosition()[0] for agent in agentStates])
+        state.ys = array('d', [agent.getPosition()[1] for agent in agentStates])
+        state.directions = [agent.getDirection() for agent in agentStates]
+        state.scaredTimers = array('i', [agent.getScaredTimer() for agent in agentStates])
+        state.starts = tuple(gameState.getInitialAgentPosition(index)
+                for index in range(state.numAgents))
+
+        state.food = 0
+        for x, y in gameState.getFood().asList():
+            state.food |= 1 << (x * state.height + y)
+
+        state.numFood = bin(state.food).count('1')
+        state.capsules = tuple(gameState.getCapsules())
+        state.score = gameState.getScore()
+        state.win = gameState.isWin()
+        state.lose = gameState.isLose()
+
+        state.hasher = hasher
+        state.zobrist = hasher.hashState(state) if hasher is not None else None
+
+        return state
+
+    def copy(self):
+        state = SearchState()
+        state.walls = self.walls
+        state.height = self.height
+        state.numAgents = self.numAgents
+        state.xs = array('d', self.xs)
+        state.ys = array('d', self.ys)
+        state.directions = list(self.directions)
+        state.scaredTimers = array('i', self.scaredTimers)
+        state.starts = self.starts
+        state.food = self.food
+        state.numFood = self.numFood
+        state.capsules = self.capsules
+        state.score = self.score
+        state.win = self.win
+        state.lose = self.lose
+        state.hasher = self.hasher
+        state.zobrist = self.zobrist
+
+        return state
+
+    def getLegalActions(self, agentIndex = 0):
+        if self.win or self.lose:
+            return []
+
+        x = self.xs[agentIndex]
+        y = self.ys[agentIndex]
+        xInt = int(x + 0.5)
+        yInt = int(y + 0.5)
+
+        # Between cells (only scared ghosts can be), an agent can only keep going.
+        if abs(x - xInt) + abs(y - yInt) > Actions.TOLERANCE:
+            return [self.directions[agentIndex]]
+
+        possible = []
+        for action in ACTIONS:
+            dx, dy = Actions.directionToVector(action)
+            if not self.walls[xInt + int(dx)][yInt + int(dy)]:
+                possible.append(action)
+
+        if agentIndex == 0:
+            return possible
+
+        possible.remove(Directions.STOP)
+        reverse = Actions.reverseDirection(self.directions[agentIndex])
+        if reverse in possible and len(possible) > 1:
+            possible.remove(reverse)
+
+        return possible
+
+    def _saveAgent(self, index):
+        return (index, self.xs[index], self.ys[index], self.directions[index], self.scaredTimers[index])
+
+    def _agentKey(self, index):
+        return self.hasher.agentFeaturesKey(index, (self.xs[index], self.ys[index]),
+                self.directions[index], self.scaredTimers[index])
+
+    def apply(self, agentIndex, action):
+        """
+        Make a move in place, and return a record for `SearchState.undo`.
+        The move is assumed to be legal.
+        """
+
+        if agentIndex == 0:
+            changed = range(self.numAgents)
+        else:
+            changed = (agentIndex,)
+
+        saved = [self._saveAgent(index) for index in changed]
+        record = (saved, self.food, self.numFood, self.capsules, self.score, self.win, self.lose,
+                self.zobrist)
+
+        if self.hasher is not None:
+            for index in changed:
+                self.zobrist ^= self._agentKey(index)
+
+        if agentIndex == 0:
+            self._movePacman(action)
+        else:
+            self._moveGhost(agentIndex, action)
+
+        if self.hasher is not None:
+            for index in changed:
+                self.zobrist ^= self._agentKey(index)
+
+        return record
+
+    def undo(self, record):
+        """
+        Take back the move that returned `record` (moves must be undone in reverse order).
+        """
+
+        saved, self.food, self.numFood, self.capsules, self.score, self.win, self.lose, \
+                self.zobrist = record
+
+        for index, x, y, direction, scaredTimer in saved:
+            self.xs[index] = x
+            self.ys[index] = y
+            self.directions[index] = direction
+            self.scaredTimers[index] = scaredTimer
+
+    def _move(self, agentIndex, action, speed):
+        dx, dy = Actions.directionToVector(action, speed)
+        self.xs[agentIndex] += dx
+        self.ys[agentIndex] += dy
+        if action != Directions.STOP:
+            self.directions[agentIndex] = action
+
+    def _movePacman(self, action):
+        self._move(0, action, 1.0)
+
+        x = self.xs[0]
+        y = self.ys[0]
+        nearest = (int(x + 0.5), int(y + 0.5))
+        if abs(nearest[0] - x) + abs(nearest[1] - y) <= 0.5:
+            self._consume(nearest)
+
+        self.score -= TIME_PENALTY
+
+        for index in range(1, self.numAgents):
+            self._checkCollision(index)
+
+    def _consume(self, position):
+        x, y = position
+        bit = 1 << (x * self.height + y)
+        if self.food & bit:
+            self.food ^= bit
+            self.numFood -= 1
+            self.score += FOOD_SCORE
+            if self.hasher is not None:
+                self.zobrist ^= self.hasher.foodKey(position)
+
+            if self.numFood == 0 and not self.lose:
+                self.score += WIN_SCORE
+                self.win = True
+
+        if position in self.capsules:
+            self.capsules = tuple(capsule for capsule in self.capsules if capsule != position)
+            if self.hasher is not None:
+                self.zobrist ^= self.hasher.capsuleKey(position)
+
+            for index in range(1, self.numAgents):
+                self.scaredTimers[index] = SCARED_TIME
+
+    def _moveGhost(self, agentIndex, action):
+        timer = self.scaredTimers[agentIndex]
+        self._move(agentIndex, action, 0.5 if timer > 0 else 1.0)
+
+        if timer == 1:
+            self.xs[agentIndex] = int(self.xs[agentIndex] + 0.5)
+            self.ys[agentIndex] = int(self.ys[agentIndex] + 0.5)
+
+        self.scaredTimers[agentIndex] = max(0, timer - 1)
+
+        self._checkCollision(agentIndex)
+
+    def _checkCollision(self, index):
+        distance = abs(self.xs[index] - self.xs[0]) + abs(self.ys[index] - self.ys[0])
+        if distance > COLLISION_TOLERANCE:
+            return
+
+        if self.scaredTimers[index] > 0:
+            self.score += GHOST_SCORE
+            self.xs[index], self.ys[index] = self.starts[index]
+            self.directions[index] = Directions.STOP
+            self.scaredTimers[index] = 0
+        elif not self.win:
+            self.score -= LOSE_SCORE
+            self.lose = True
+
+    def generateSuccessor(self, agentIndex, action):
+        """
+        Like `apply`, but on a copy of this state (which is left alone).
+        """
+
+        if self.win or self.lose:
+            raise RuntimeError("Can't generate a successor of a terminal state.")
+
+        successor = self.copy()
+        successor.apply(agentIndex, action)
+        return successor
+
+    def generatePacmanSuccessor(self, action):
+        return self.generateSuccessor(0, action)
+
+    def getLegalPacmanActions(self):
+        return self.getLegalActions(0)
+
+    # The parts of the game state API that evaluation functions use.
+
+    def getNumAgents(self):
+        return self.numAgents
+
+    def getScore(self):
+        return self.score
+
+    def isWin(self):
+        return self.win
+
+    def isLose(self):
+        return self.lose
+
+    def isOver(self):
+        return self.win or self.lose
+
+    def getWalls(self):
+        return self.walls
+
+    def getFood(self):
+        return FoodView(self.food, self.walls.getWidth(), self.height)
+
+    def getNumFood(self):
+        return self.numFood
+
+    def hasFood(self, x, y):
+        return bool((self.food >> (x * self.height + y)) & 1)
+
+    def getCapsules(self):
+        return list(self.capsules)
+
+    def getAgentPosition(self, index):
+        return (self.xs[index], self.ys[index])
+
+    def getPacmanPosition(self):
+        return (self.xs[0], self.ys[0])
+
+    def getGhostPosition(self, index):
+        return (self.xs[index], self.ys[index])
+
+    def getGhostPositions(self):
+        return [(self.xs[index], self.ys[index]) for index in range(1, self.numAgents)]
+
+    def getAgentState(self, index):
+        return AgentView(index == 0, (self.xs[index], self.ys[index]), self.directions[index],
+                self.scaredTimers[index])
+
+    def getPacmanState(self):
+        return self.getAgentState(0)
+
+    def getGhostState(self, index):
+        return self.getAgentState(index)
+
+    def getGhostStates(self):
+        return [self.getAgentState(index) for index in range(1, self.numAgents)]
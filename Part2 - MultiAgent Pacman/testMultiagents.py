@@ -0,0 +1,457 @@
+"""
+Equivalence tests for the game tree search options in `pacai.student.multiagents`:
+every option is checked against the plain search it is meant to speed up.
+
+Run with `python -m unittest pacai.student.testMultiagents`.
+"""
+
+import random
+import time
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.layout import Layout
+from pacai.core.layout import getLayout
+
+from pacai.student import mazeEvaluation
+from pacai.student import multiagents
+from pacai.student.distanceTable import getDistanceTable
+from pacai.student.searchState import SearchState
+from pacai.student.transposition import ZobristHasher
+
+EVAL_FN = 'pacai.student.multiagents.betterEvaluationFunction'
+
+# A capsule and food on one side of Pacman, more food on the other, and a ghost in the pocket below.
+CAPSULE_LAYOUT = [
+    '%%%%%%%%%%%%%%',
+    '%.o P   %....%',
+    '%%%%%%G%%%%%%%',
+    '%%%%%% %%%%%%%',
+    '%%%%%%%%%%%%%%',
+]
+
+def makeState(layout):
+    if isinstance(layout, str):
+        return PacmanGameState(getLayout(layout))
+
+    return PacmanGameState(Layout(layout))
+
+def reachableStates(state, agentIndex, pacmanMoves):
+    """
+    Every state reachable from `state` (with `agentIndex` to move)
+    until `pacmanMoves` more Pacman moves have been made and every ghost has moved after them.
+    """
+
+    yield state
+    if state.isWin() or state.isLose():
+        return
+
+    nextAgent = (agentIndex + 1) % state.getNumAgents()
+    if nextAgent == 0:
+        if pacmanMoves == 0:
+            for action in state.getLegalActions(agentIndex):
+                yield state.generateSuccessor(agentIndex, action)
+            return
+
+        pacmanMoves -= 1
+
+    for action in state.getLegalActions(agentIndex):
+        yield from reachableStates(state.generateSuccessor(agentIndex, action), nextAgent, pacmanMoves)
+
+def compactFields(state):
+    """ Everything a `SearchState` holds, to check that searches leave it as they found it. """
+    return (list(state.xs), list(state.ys), list(state.directions), list(state.scaredTimers),
+            state.food, state.capsules, state.score, state.win, state.lose, state.zobrist)
+
+def observed(state):
+    """ What the rules and evaluation functions can see of a state. """
+    return (state.getPacmanPosition(), state.getGhostPositions(),
+            [(ghost.getDirection(), ghost.getScaredTimer()) for ghost in state.getGhostStates()],
+            state.getScore(), state.isWin(), state.isLose(), state.getFood().asList(),
+            sorted(state.getCapsules()),
+            [state.getLegalActions(index) for index in range(state.getNumAgents())])
+
+def playActions(makeAgent, layout, moves):
+    """
+    The actions an agent picks over a few moves, with every ghost taking its first legal action.
+    """
+
+    state = makeState(layout)
+    agent = makeAgent()
+    actions = []
+
+    for _ in range(moves):
+        if state.isOver():
+            break
+
+        action = agent.getAction(state)
+        actions.append(action)
+        state = state.generateSuccessor(0, action)
+
+        for ghost in range(1, state.getNumAgents()):
+            if state.isOver():
+                break
+            state = state.generateSuccessor(ghost, state.getLegalActions(ghost)[0])
+
+    agent.final(state)
+    return actions
+
+class SearchStateTest(unittest.TestCase):
+    def testMovesFollowTheGameRules(self):
+        rng = random.Random(0)
+        hasher = ZobristHasher()
+
+        for layout in (CAPSULE_LAYOUT, 'minimaxClassic', 'smallClassic'):
+            for _ in range(10):
+                gameState = makeState(layout)
+                state = SearchState.fromGameState(gameState, hasher)
+                records = []
+                snapshots = []
+                agentIndex = 0
+
+                while not gameState.isOver():
+                    action = rng.choice(gameState.getLegalActions(agentIndex))
+                    snapshots.append(compactFields(state))
+                    records.append(state.apply(agentIndex, action))
+                    gameState = gameState.generateSuccessor(agentIndex, action)
+
+                    self.assertEqual(observed(gameState), observed(state))
+                    self.assertEqual(hasher.hashState(gameState), state.zobrist)
+                    self.assertEqual(observed(gameState),
+                            observed(SearchState.fromGameState(gameState)))
+                    agentIndex = (agentIndex + 1) % gameState.getNumAgents()
+
+                # Taking every move back restores each earlier state exactly.
+                while records:
+                    state.undo(records.pop())
+                    self.assertEqual(snapshots.pop(), compactFields(state))
+
+    def testCompactAgentsPickTheSameActions(self):
+        for name, options in (('MinimaxAgent', {}), ('AlphaBetaAgent', {'transpositionTable': 'true'}),
+                ('ExpectimaxAgent', {}), ('ExpectimaxAgent', {'samples': '2'}),
+                ('ExpectimaxAgent', {'pruning': 'star1', 'transpositionTable': 'true'})):
+            agentClass = getattr(multiagents, name)
+            for layout in (CAPSULE_LAYOUT, 'smallClassic'):
+                random.seed(0)
+                expected = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3, **options),
+                        layout, 6)
+                random.seed(0)
+                actions = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3,
+                        compactState = 'true', **options), layout, 6)
+                self.assertEqual(expected, actions, (name, options))
+
+def countingAgent(agent, counts):
+    """ Make an agent count how often it evaluates a state (in `counts[0]`). """
+    evaluationFunction = agent.getEvaluationFunction()
+
+    def countingEvaluation(state):
+        counts[0] += 1
+        return evaluationFunction(state)
+
+    agent._evaluationFunction = countingEvaluation
+    return agent
+
+class TranspositionTableTest(unittest.TestCase):
+    def testTableSavesEvaluations(self):
+        for name in ('MinimaxAgent', 'AlphaBetaAgent', 'ExpectimaxAgent'):
+            agentClass = getattr(multiagents, name)
+            for layout in (CAPSULE_LAYOUT, 'smallClassic'):
+                plainCounts = [0]
+                expected = playActions(lambda: countingAgent(agentClass(0, evalFn = EVAL_FN,
+                        depth = 3), plainCounts), layout, 6)
+
+                tableCounts = [0]
+                actions = playActions(lambda: countingAgent(agentClass(0, evalFn = EVAL_FN,
+                        depth = 3, transpositionTable = 'true'), tableCounts), layout, 6)
+
+                self.assertEqual(expected, actions, (name, layout))
+                self.assertLess(tableCounts[0], plainCounts[0], (name, layout))
+
+    def testEntriesAreReusedAtOtherScores(self):
+        # Pacman walks back and forth in this layout, so positions come back at a lower score.
+        for name in ('MinimaxAgent', 'AlphaBetaAgent', 'ExpectimaxAgent'):
+            agentClass = getattr(multiagents, name)
+
+            def makeAgent(scoreRelative, counts):
+                agent = countingAgent(agentClass(0, evalFn = EVAL_FN, depth = 3,
+                        transpositionTable = 'true'), counts)
+                self.assertTrue(agent._scoreRelative)
+                agent._scoreRelative = scoreRelative
+                return agent
+
+            scoredCounts = [0]
+            expected = playActions(lambda: makeAgent(False, scoredCounts), CAPSULE_LAYOUT, 12)
+
+            relativeCounts = [0]
+            actions = playActions(lambda: makeAgent(True, relativeCounts), CAPSULE_LAYOUT, 12)
+
+            self.assertEqual(expected, actions, name)
+            self.assertLess(relativeCounts[0], scoredCounts[0], name)
+
+    def testSmallTableStillPicksTheSameActions(self):
+        for name in ('MinimaxAgent', 'AlphaBetaAgent', 'ExpectimaxAgent'):
+            agentClass = getattr(multiagents, name)
+            expected = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3), 'smallClassic', 6)
+            actions = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3,
+                    transpositionTable = 'true', tableSize = '16'), 'smallClassic', 6)
+            self.assertEqual(expected, actions, name)
+
+def mazeBetterEvaluation(state, table):
+    """ `betterEvaluationFunction` on maze distances, computed from scratch. """
+    position = state.getPacmanPosition()
+    food = state.getFood().asList()
+    value = state.getScore()
+
+    if food:
+        value += 10 / table.getMinDistance(position, food)
+
+    for ghost in state.getGhostStates():
+        distance = table.getDistance(position, ghost.getPosition())
+        if ghost.getScaredTimer() == 0 and distance < 2:
+            value -= 100
+        elif ghost.getScaredTimer() > 0 and distance < 5:
+            value += 50
+
+    return value - 5 * len(food) - 20 * len(state.getCapsules())
+
+class MazeEvaluationTest(unittest.TestCase):
+    def testMatchesDirectComputation(self):
+        for layout in (CAPSULE_LAYOUT, 'minimaxClassic'):
+            root = makeState(layout)
+            table = getDistanceTable(root.getWalls())
+            evaluator = mazeEvaluation.MazeEvaluator(root.getWalls(), maxEntries = 50)
+
+            for state in reachableStates(root, 0, 2):
+                expected = mazeBetterEvaluation(state, table)
+                self.assertAlmostEqual(expected, mazeEvaluation.mazeBetterEvaluationFunction(state))
+                self.assertAlmostEqual(expected, evaluator.evaluate('betterEvaluation', state))
+
+                # SearchStates (with and without Zobrist keys) get the same values.
+                for hasher in (None, ZobristHasher()):
+                    compact = SearchState.fromGameState(state, hasher)
+                    self.assertAlmostEqual(expected, evaluator.evaluate('betterEvaluation', compact))
+
+            self.assertGreater(evaluator.hits, 0)
+
+    def testReflexEvaluation(self):
+        agent = multiagents.ReflexAgent(0, mazeDistances = 'true')
+        for layout in (CAPSULE_LAYOUT, 'minimaxClassic'):
+            root = makeState(layout)
+            table = getDistanceTable(root.getWalls())
+
+            for state in reachableStates(root, 0, 1):
+                if state.isOver():
+                    continue
+
+                for action in state.getLegalActions(0):
+                    successor = state.generatePacmanSuccessor(action)
+                    position = successor.getPacmanPosition()
+                    food = successor.getFood().asList()
+
+                    expected = successor.getScore() + 10 / (table.getMinDistance(position, food)
+                            if food else 1)
+                    for ghost in successor.getGhostStates():
+                        if table.getDistance(position, ghost.getPosition()) < 2:
+                            expected += 50 if ghost.getScaredTimer() > 0 else -100
+
+                    self.assertAlmostEqual(expected, agent.evaluationFunction(state, action))
+
+class RisingAlpha(object):
+    """
+    Stands in for the shared alpha of a parallel search:
+    it reads as -inf at first, then as `value` (as if another worker had found it) after `reads` reads.
+    """
+
+    def __init__(self, reads, value):
+        self._reads = reads
+        self._value = value
+
+    @property
+    def value(self):
+        self._reads -= 1
+        return float('-inf') if self._reads >= 0 else self._value
+
+def rootValues(agent, state):
+    agent._depthLimit = agent.getTreeDepth()
+    return [agent.alphabeta(state.generateSuccessor(0, action), 1, 1, float('-inf'), float('inf'))
+            for action in state.getLegalActions(0)]
+
+def totalNodes(makeAgent, layout, moves):
+    """
+    The number of nodes an alpha-beta agent searches over a few moves (ghosts as in `playActions`).
+    """
+
+    state = makeState(layout)
+    agent = makeAgent()
+    nodes = 0
+
+    for _ in range(moves):
+        if state.isOver():
+            break
+
+        state = state.generateSuccessor(0, agent.getAction(state))
+        nodes += agent.nodeCount
+
+        for ghost in range(1, state.getNumAgents()):
+            if state.isOver():
+                break
+            state = state.generateSuccessor(ghost, state.getLegalActions(ghost)[0])
+
+    return nodes
+
+class AlphaBetaOptionsTest(unittest.TestCase):
+    OPTIONS = (
+        {'pvs': 'true'},
+        {'ordering': 'true'},
+        {'transpositionTable': 'true'},
+        {'pvs': 'true', 'ordering': 'true', 'transpositionTable': 'true'},
+        {'timeBudget': '100', 'pvs': 'true', 'ordering': 'true', 'transpositionTable': 'true'},
+        {'compactState': 'true', 'pvs': 'true', 'transpositionTable': 'true'},
+    )
+
+    def testOptionsPickTheSameActions(self):
+        for layout, depth in ((CAPSULE_LAYOUT, 4), ('minimaxClassic', 4), ('smallClassic', 3)):
+            expected = playActions(lambda: multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN,
+                    depth = depth), layout, 6)
+
+            for options in AlphaBetaOptionsTest.OPTIONS:
+                actions = playActions(lambda: multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN,
+                        depth = depth, **options), layout, 6)
+                self.assertEqual(expected, actions, options)
+
+    def testRootActionsShareAlpha(self):
+        for layout, depth in ((CAPSULE_LAYOUT, 4), ('minimaxClassic', 4), ('smallClassic', 3)):
+            state = makeState(layout)
+            agent = multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN, depth = depth)
+
+            agent.nodeCount = 0
+            values = rootValues(agent, state)
+            fullWindowNodes = agent.nodeCount
+
+            action = agent.getAction(state)
+            self.assertEqual(state.getLegalActions(0)[values.index(max(values))], action, layout)
+            self.assertLess(agent.nodeCount, fullWindowNodes, layout)
+
+class IterativeDeepeningTest(unittest.TestCase):
+    def testLargeBudgetMatchesFixedDepth(self):
+        for layout, depth in ((CAPSULE_LAYOUT, 4), ('smallClassic', 3)):
+            expected = playActions(lambda: multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN,
+                    depth = depth), layout, 6)
+            actions = playActions(lambda: multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN,
+                    depth = depth, timeBudget = '100'), layout, 6)
+            self.assertEqual(expected, actions)
+
+    def testStopsAtTheDeadline(self):
+        state = makeState('smallClassic')
+        agent = multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN, depth = 50, timeBudget = '0.05')
+
+        startTime = time.perf_counter()
+        action = agent.getAction(state)
+        elapsed = time.perf_counter() - startTime
+
+        self.assertIn(action, state.getLegalActions(0))
+        # Depth 1 always finishes, and deeper searches give up once the budget is spent.
+        self.assertLess(elapsed, 1.0)
+
+class ParallelAlphaBetaTest(unittest.TestCase):
+    def testSharedAlphaKeepsTableExact(self):
+        for layout, depth in ((CAPSULE_LAYOUT, 3), ('minimaxClassic', 3), ('smallClassic', 2)):
+            root = makeState(layout)
+            expected = rootValues(multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN, depth = depth), root)
+
+            for reads in (5, 20, 50, 200):
+                for pvs in ('false', 'true'):
+                    agent = multiagents.AlphaBetaAgent(0, evalFn = EVAL_FN, depth = depth,
+                            transpositionTable = 'true', pvs = pvs)
+
+                    # Fill the table while the shared alpha rises under the searches.
+                    for action in root.getLegalActions(0):
+                        agent._sharedAlpha = RisingAlpha(reads, max(expected))
+                        agent._rootActionValue(root, action, float('-inf'))
+
+                    agent._sharedAlpha = None
+                    values = [agent._rootActionValue(root, action, float('-inf'))
+                            for action in root.getLegalActions(0)]
+                    self.assertEqual(expected, values)
+
+    def testParallelPicksTheSameActions(self):
+        for name, options in (('MinimaxAgent', {}), ('AlphaBetaAgent', {'transpositionTable': 'true'}),
+                ('AlphaBetaAgent', {'transpositionTable': 'true', 'pvs': 'true'}),
+                ('ExpectimaxAgent', {'pruning': 'star1'})):
+            agentClass = getattr(multiagents, name)
+            expected = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3, **options),
+                    'minimaxClassic', 5)
+            actions = playActions(lambda: agentClass(0, evalFn = EVAL_FN, depth = 3, parallel = 2,
+                    **options), 'minimaxClassic', 5)
+            self.assertEqual(expected, actions, name)
+
+    def testAgentsWithoutRootValuesStaySequential(self):
+        class SequentialAgent(multiagents.TreeSearchAgent):
+            pass
+
+        with self.assertRaises(ValueError):
+            SequentialAgent(0, evalFn = EVAL_FN, parallel = 2)
+
+        self.assertEqual(1, SequentialAgent(0, evalFn = EVAL_FN, parallel = 1).parallel)
+
+class ExpectimaxPruningTest(unittest.TestCase):
+    def testEvaluationBoundsHold(self):
+        for layout in (CAPSULE_LAYOUT, 'minimaxClassic'):
+            root = makeState(layout)
+            for action in root.getLegalActions(0):
+                child = root.generateSuccessor(0, action)
+                for evalFn, bounds in multiagents.EVALUATION_BOUNDS.items():
+                    for pacmanMoves in range(3):
+                        low, high = bounds(child, pacmanMoves)
+                        for state in reachableStates(child, 1, pacmanMoves):
+                            value = evalFn(state)
+                            self.assertTrue(low <= value <= high,
+                                    '%s: %s not in [%s, %s] (%s, %d moves).'
+                                    % (evalFn.__name__, value, low, high, action, pacmanMoves))
+
+    def testPrunedValuesMatchPlainSearch(self):
+        plain = multiagents.ExpectimaxAgent(0, evalFn = EVAL_FN, depth = 3)
+        plain._startSearch()
+
+        for compact in (False, True):
+            agent = multiagents.ExpectimaxAgent(0, evalFn = EVAL_FN, depth = 3, pruning = 'star1')
+            agent._startSearch()
+
+            for layout in (CAPSULE_LAYOUT, 'minimaxClassic'):
+                root = makeState(layout)
+                for action in root.getLegalActions(0):
+                    child = root.generateSuccessor(0, action)
+                    value = plain.expectimax(child, 1, 1)
+                    if compact:
+                        child = SearchState.fromGameState(child)
+                        before = compactFields(child)
+
+                    alphas = [float('-inf')] + [value + 0.3 * step for step in range(-10, 11)]
+                    for alpha in alphas:
+                        for beta in (float('inf'), alpha + 1, alpha + 10):
+                            pruned = agent.expectimaxPruned(child, 1, 1, alpha, beta)
+                            if compact:
+                                self.assertEqual(before, compactFields(child))
+                            if value < alpha:
+                                self.assertTrue(value - 1e-9 <= pruned < alpha)
+                            elif value > beta:
+                                self.assertTrue(beta < pruned <= value + 1e-9)
+                            else:
+                                self.assertAlmostEqual(pruned, value)
+
+    def testPrunedAgentsPickTheSameActions(self):
+        for layout, depth in ((CAPSULE_LAYOUT, 3), ('minimaxClassic', 3)):
+            expected = playActions(lambda: multiagents.ExpectimaxAgent(0, evalFn = EVAL_FN,
+                    depth = depth), layout, 6)
+
+            actions = playActions(lambda: multiagents.ExpectimaxAgent(0, evalFn = EVAL_FN,
+                    depth = depth, pruning = 'star1'), layout, 6)
+            self.assertEqual(expected, actions)
+
+    def testUnknownPruningIsRejected(self):
+        for pruning in ('star2', 'alphabeta'):
+            with self.assertRaises(ValueError):
+                multiagents.ExpectimaxAgent(0, evalFn = EVAL_FN, pruning = pruning)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+"""
+Zobrist hashing and a transposition table for the game tree searches in `pacai.student.multiagents`.
+
+The same position is often reached through different move orders
+(e.g. two ghosts moving in either order, or Pacman stepping back and forth),
+and each time its whole subtree would be searched again.
+A `ZobristHasher` gives every game state a 64 bit key that is updated incrementally
+from the parent's key when a move is made,
+and a `TranspositionTable` remembers the value each key was searched to.
+
+A Zobrist key is the XOR of one random number per feature of the state:
+the position, direction, and scared timer of each agent, and each remaining food and capsule.
+The score is not part of the key.
+Table entries are keyed by (Zobrist key, agent to move, score),
+or, when the evaluation function is the score plus a function of the position,
+by (Zobrist key, agent to move) with the value stored relative to the node's score,
+so positions searched for earlier moves (at a lower score) are reused
+(see `pacai.student.multiagents.TreeSearchAgent._tableKey`).
+"""
+
+import random
+
+# What a stored value means:
+# the exact value, or only a lower/upper bound because the search of that node was cut off.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+DEFAULT_TABLE_SIZE = 200000
+
+class ZobristHasher(object):
+    """
+    Random keys for the features of the game states of one layout.
+    Keys are made on first use and come from a seeded generator,
+    so they depend on the order features are first seen in:
+    keys of two hashers can not be compared.
+    """
+
+    def __init__(self, seed = 0):
+        self._random = random.Random(seed)
+        self._keys = {}
+
+    def _key(self, feature):
+        key = self._keys.get(feature)
+        if key is None:
+            key = self._random.getrandbits(64)
+            self._keys[feature] = key
+
+        return key
+
+    def agentKey(self, agentIndex, agentState):
+        """
+        The key of everything about one agent: its position (which can be a half cell for scared ghosts),
+        direction, and scared timer.
+        """
+
+        return self.agentFeaturesKey(agentIndex, agentState.getPosition(), agentState.getDirection(),
+                agentState.getScaredTimer())
+
+    def agentFeaturesKey(self, agentIndex, position, direction, scaredTimer):
+        x, y = position
+        return (self._key(('position', agentIndex, int(x * 2), int(y * 2)))
+                ^ self._key(('direction', agentIndex, direction))
+                ^ self._key(('scared', agentIndex, scaredTimer)))
+
+    def foodKey(self, position):
+        return self._key(('food', position))
+
+    def capsuleKey(self, position):
+        return self._key(('capsule', position))
+
+    def hashState(self, state):
+        """
+        Compute the key of a game state from scratch.
+        """
+
+        key = 0
+        for agentIndex in range(state.getNumAgents()):
+            key ^= self.agentKey(agentIndex, state.getAgentState(agentIndex))
+
+        for position in state.getFood().asList():
+            key ^= self.foodKey(position)
+
+        for position in state.getCapsules():
+            key ^= self.capsuleKey(position)
+
+        return key
+
+    def updateHash(self, key, state, agentIndex, successor):
+        """
+        Get the key of `successor` (the result of `agentIndex` moving in `state`) from the key of `state`.
+        Only the agents that can have changed are looked at:
+        a Pacman move can eat food or a capsule (scaring every ghost) or a ghost (sending it home),
+        while a ghost move only changes that ghost.
+        """
+
+        if agentIndex != 0:
+            return (key ^ self.agentKey(agentIndex, state.getAgentState(agentIndex))
+                    ^ self.agentKey(agentIndex, successor.getAgentState(agentIndex)))
+
+        for index in range(state.getNumAgents()):
+            old = state.getAgentState(index)
+            new = successor.getAgentState(index)
+            moved = (old.getPosition(), old.getDirection()) != (new.getPosition(), new.getDirection())
+            if index == 0 or moved or old.getScaredTimer() != new.getScaredTimer():
+                key ^= self.agentKey(index, old) ^ self.agentKey(index, new)
+
+        x, y = successor.getPacmanPosition()
+        position = (int(x + 0.5), int(y + 0.5))
+        if state.hasFood(*position) and not successor.hasFood(*position):
+            key ^= self.foodKey(position)
+
+        if position in state.getCapsules():
+            key ^= self.capsuleKey(position)
+
+        return key
+
+class TableEntry(object):
+    __slots__ = ('depth', 'value', 'bound', 'action')
+
+    def __init__(self, depth, value, bound, action):
+        self.depth = depth
+        self.value = value
+        self.bound = bound
+        self.action = action
+
+class TranspositionTable(object):
+    """
+    A bounded map from a node's key (see the module docstring) to the result of searching that node:
+    its value, how many plies below it were searched, whether the value is exact or a bound,
+    and the best action found there (for move ordering).
+    Values can be stored relative to an `offset` (e.g. the node's score),
+    which is taken off when storing and added back when probing.
+    When full, the oldest entries are dropped first.
+    The table is meant to be kept for a whole game, so its counters cover every search so far.
+    """
+
+    def __init__(self, maxEntries = DEFAULT_TABLE_SIZE):
+        self.maxEntries = maxEntries
+        self._entries = {}
+
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Get the entry of a node, or None.
+        """
+
+        self.probes += 1
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+
+        return entry
+
+    def probe(self, key, depth, alpha = float('-inf'), beta = float('inf'), offset = 0):
+        """
+        Look up a node that is about to be searched `depth` plies deep with the window (alpha, beta).
+        Returns a (value, action) pair:
+        a stored value that can stand in for the search (or None),
+        and the best action stored for the node (or None), which is worth trying first.
+        Bounds are only used when they fall strictly outside of the window,
+        which is the same condition the searches use to cut off.
+        """
+
+        entry = self.get(key)
+        if entry is None:
+            return None, None
+
+        if entry.depth < depth:
+            return None, entry.action
+
+        value = entry.value + offset
+        if entry.bound == EXACT or (entry.bound == LOWER and value > beta):
+            return value, entry.action
+
+        if entry.bound == UPPER and value < alpha:
+            return value, entry.action
+
+        return None, entry.action
+
+    def store(self, key, depth, value, bound = EXACT, action = None, offset = 0):
+        self.stores += 1
+        value -= offset
+
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry.depth > depth and entry.bound == EXACT:
+            # Keep the deeper, exact result (but mark it as recently used).
+            self._entries[key] = entry
+            return
+
+        if len(self._entries) >= self.maxEntries:
+            del self._entries[next(iter(self._entries))]
+            self.evictions += 1
+
+        self._entries[key] = TableEntry(depth, value, bound, action)
+
+    def hitRate(self):
+        return self.hits / self.probes if self.probes > 0 else 0.0
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return ('TranspositionTable(entries: %d, probes: %d, hits: %d (%.1f%%), stores: %d, evictions: %d)'
+                % (len(self._entries), self.probes, self.hits, 100.0 * self.hitRate(),
+                    self.stores, self.evictions))
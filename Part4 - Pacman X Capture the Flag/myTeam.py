@@ -1,4 +1,26 @@
 from pacai.agents.capture.capture import CaptureAgent
+from pacai.student.distanceField import distanceAt
+from pacai.student.distanceField import distanceField
+from pacai.student.distanceTable import getDistanceTable
+
+MAX_TARGET_FIELDS = 64
+
+def closestDistance(fields, walls, position, targets):
+    """
+    The maze distance from a position to the closest of some targets.
+    The targets rarely change between the successors of a turn (or between turns),
+    so the distance field seeded from them is kept in `fields`, keyed by the targets.
+    """
+    key = tuple(sorted(targets))
+    field = fields.get(key)
+    if field is None:
+        if len(fields) >= MAX_TARGET_FIELDS:
+            del fields[next(iter(fields))]
+
+        field = distanceField(walls, key)
+        fields[key] = field
+
+    return distanceAt(field, position)
 
 class SmartOffensiveAgent(CaptureAgent):
     """
@@ -7,6 +29,9 @@ class SmartOffensiveAgent(CaptureAgent):
     def registerInitialState(self, gameState):
         CaptureAgent.registerInitialState(self, gameState)
         self.start = gameState.getAgentPosition(self.index)
+        self.walls = gameState.getWalls()
+        self.distances = getDistanceTable(self.walls)
+        self.fields = {}
 
     def chooseAction(self, gameState):
         """
@@ -43,18 +68,18 @@ class SmartOffensiveAgent(CaptureAgent):
 
         # Prioritize eating food
         if len(foodList) > 0:
-            minFoodDist = min([self.getMazeDistance(myPos, food) for food in foodList])
+            minFoodDist = closestDistance(self.fields, self.walls, myPos, foodList)
             score -= minFoodDist  # Closer to food is better
 
         # Avoid ghosts
         for ghost in ghosts:
-            ghostDist = self.getMazeDistance(myPos, ghost.getPosition())
+            ghostDist = self.distances.getDistance(myPos, ghost.getPosition())
             if ghostDist < 3:  # Ghost is too close
                 score -= 100  # Heavy penalty to avoid it
 
         # Prioritize power capsules
         if len(capsules) > 0:
-            minCapsuleDist = min([self.getMazeDistance(myPos, cap) for cap in capsules])
+            minCapsuleDist = closestDistance(self.fields, self.walls, myPos, capsules)
             score -= minCapsuleDist * 0.5  # Prefer capsules, but not over food
 
         return score
@@ -70,6 +95,9 @@ class SmartDefensiveAgent(CaptureAgent):
     def registerInitialState(self, gameState):
         CaptureAgent.registerInitialState(self, gameState)
         self.start = gameState.getAgentPosition(self.index)
+        self.walls = gameState.getWalls()
+        self.distances = getDistanceTable(self.walls)
+        self.fields = {}
 
     def chooseAction(self, gameState):
         """
@@ -103,13 +131,14 @@ class SmartDefensiveAgent(CaptureAgent):
 
         # Chase enemy Pacman
         if len(invaders) > 0:
-            minInvaderDist = min([self.getMazeDistance(myPos, a.getPosition()) for a in invaders])
+            minInvaderDist = closestDistance(self.fields, self.walls, myPos,
+                    [a.getPosition() for a in invaders])
             score -= minInvaderDist  # Prioritize being closer to invaders
 
         # Guard important food
         foodToDefend = self.getFoodYouAreDefending(gameState).asList()
         if len(foodToDefend) > 0:
-            minFoodDist = min([self.getMazeDistance(myPos, food) for food in foodToDefend])
+            minFoodDist = closestDistance(self.fields, self.walls, myPos, foodToDefend)
             score -= minFoodDist * 0.5  # Stay near food
 
         return score